@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import os
+from app.instrumentation import mongo_command_listener, record_error
 
 # Cargar variables del entorno
 load_dotenv()
@@ -9,22 +10,53 @@ load_dotenv()
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = "ibiztrack"
 
-# Cliente Mongo
-client = AsyncIOMotorClient(MONGODB_URL)
+# Cliente Mongo (con monitoreo de la latencia de cada comando)
+client = AsyncIOMotorClient(MONGODB_URL, event_listeners=[mongo_command_listener])
 database = client[DATABASE_NAME]
 
 # Colecciones
 products_collection = database.get_collection("products")
 orders_collection = database.get_collection("orders")
+order_rollups_collection = database.get_collection("order_daily_rollups")
 
-# Crear índices
+# Construir índices al arrancar (desactivar con DB_BUILD_INDEXES_ON_STARTUP=false
+# y usar `python -m app.indexes build` en colecciones grandes)
+DB_BUILD_INDEXES_ON_STARTUP = os.getenv("DB_BUILD_INDEXES_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+
+# Crear y verificar índices
 async def init_db():
+    from app.indexes import build_indexes, verify_indexes
+
     try:
-        await products_collection.create_index("asin")
-        await orders_collection.create_index("order_number")
+        if DB_BUILD_INDEXES_ON_STARTUP:
+            report = await build_indexes()
+            for failure in report["failed"]:
+                record_error("init_db")
+                print(f"Error al crear índice: {failure}")
+
+        report = await verify_indexes()
+        if report["missing"]:
+            print(f"Índices faltantes: {', '.join(report['missing'])}")
+        if report["unused"]:
+            print(f"Índices sin uso: {', '.join(report['unused'])}")
+        if report["unregistered"]:
+            print(f"Índices no registrados: {', '.join(report['unregistered'])}")
         print("Base de datos inicializada correctamente")
     except Exception as e:
+        record_error("init_db")
         print(f"Error al inicializar la base de datos: {e}")
 
+    # Resúmenes diarios de órdenes guardadas antes de que existieran (una sola vez)
+    try:
+        from app.services.order_analytics import bootstrap_rollups
+
+        result = await bootstrap_rollups()
+        if result:
+            print(f"Resúmenes de órdenes construidos: {result['days']} días")
+    except Exception as e:
+        record_error("init_db")
+        print(f"Error al construir los resúmenes de órdenes: {e}")
+
 def get_database():
     return database
@@ -0,0 +1,141 @@
+"""
+Validación de respuestas HTTP con ETag y Last-Modified.
+
+Las lecturas de productos y órdenes llevan un ETag fuerte derivado del _id y de la
+fecha de modificación de cada documento (updated_at y, en los productos, también
+tariff_updated_at, que cambia al recalcular tarifas sin tocar updated_at) o, si no
+hay documento guardado, de un hash del cuerpo. Si el cliente ya tiene esa versión
+(`If-None-Match`, o `If-Modified-Since` cuando no envía ETag) se responde 304 sin
+armar ni serializar el cuerpo.
+
+`Cache-Control: private, no-cache` deja guardar la respuesta en el navegador pero
+obliga a revalidarla en cada uso: una recarga solo cuesta la validación.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from fastapi import Request, Response
+from app.serialization import trusted_response
+
+# Política de caché de las respuestas con validadores
+CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+
+# Cambiar al modificar la forma de las respuestas, para que los ETag ya emitidos dejen de coincidir
+REPRESENTATION_VERSION = "1"
+
+# Fechas de modificación de un documento (la más reciente es su Last-Modified)
+MODIFIED_FIELDS = ("updated_at", "tariff_updated_at")
+
+
+def modified_at(doc: Dict[str, Any]) -> Optional[datetime]:
+    """Última modificación de un documento"""
+    dates = [doc[field] for field in MODIFIED_FIELDS if doc.get(field)]
+    return max(dates) if dates else None
+
+
+def last_modified(docs: Iterable[Dict[str, Any]]) -> Optional[datetime]:
+    """Última modificación entre varios documentos (None si ninguno tiene fecha)"""
+    dates = [date for date in map(modified_at, docs) if date]
+    return max(dates) if dates else None
+
+
+def validator_projection(*fields: str) -> Dict[str, int]:
+    """Proyección mínima para calcular los validadores, más los campos indicados (p. ej. la clave del cursor)"""
+    return {field: 1 for field in (*fields, *MODIFIED_FIELDS)}
+
+
+def documents_etag(docs: Iterable[Dict[str, Any]], *variant: str) -> str:
+    """ETag fuerte de uno o varios documentos: _id y fecha de modificación de cada uno, más la vista"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("|".join((REPRESENTATION_VERSION, *variant)).encode())
+    for doc in docs:
+        modified = modified_at(doc)
+        digest.update(f"|{doc['_id']}:{modified.isoformat() if modified else ''}".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def content_etag(body: bytes) -> str:
+    """ETag fuerte a partir del cuerpo ya serializado"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def has_validators(request: Request) -> bool:
+    """Si la petición es una revalidación (el cliente envió If-None-Match o If-Modified-Since)"""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _utc(date: datetime) -> datetime:
+    # Las fechas guardadas en MongoDB son UTC sin zona horaria
+    return date.replace(tzinfo=timezone.utc) if date.tzinfo is None else date.astimezone(timezone.utc)
+
+
+def _etags(header: str) -> List[str]:
+    # Comparación débil (RFC 7232): W/"x" coincide con "x"
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def is_not_modified(request: Request, etag: str, modified: Optional[datetime]) -> bool:
+    """Si el cliente ya tiene la versión identificada por etag/modified"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Con If-None-Match se ignora If-Modified-Since
+        return if_none_match.strip() == "*" or etag in _etags(if_none_match)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified:
+        try:
+            since = _utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        # Last-Modified tiene resolución de segundos
+        return _utc(modified).replace(microsecond=0) <= since
+    return False
+
+
+def cache_headers(etag: str, modified: Optional[datetime]) -> Dict[str, str]:
+    """Cabeceras de validación de una respuesta"""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if modified:
+        headers["Last-Modified"] = format_datetime(_utc(modified).replace(microsecond=0), usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, etag: str, modified: Optional[datetime],
+                 response: Optional[Response] = None) -> Optional[Response]:
+    """
+    Respuesta 304 (sin cuerpo) si el cliente ya tiene esta versión, o None.
+    Si la ruta recibió `response`, se copian sus cabeceras (p. ej. X-Next-Cursor).
+    """
+    if not is_not_modified(request, etag, modified):
+        return None
+    headers = {}
+    if response is not None:
+        headers.update((name, value) for name, value in response.headers.items()
+                       if name not in ("content-length", "content-type"))
+    headers.update(cache_headers(etag, modified))
+    return Response(status_code=304, headers=headers)
+
+
+def cached_response(request: Request, etag: str, modified: Optional[datetime], build: Callable[[], Any],
+                    response: Optional[Response] = None) -> Response:
+    """304 si el cliente ya tiene esta versión; si no, el contenido de build() con sus validadores"""
+    unchanged = not_modified(request, etag, modified, response)
+    if unchanged is not None:
+        return unchanged
+    fast_response = trusted_response(build(), response)
+    fast_response.headers.update(cache_headers(etag, modified))
+    return fast_response
+
+
+def hashed_response(request: Request, content: Any) -> Response:
+    """Para contenido sin fecha de modificación: se serializa y el ETag es el hash del cuerpo"""
+    fast_response = trusted_response(content)
+    etag = content_etag(fast_response.body)
+    unchanged = not_modified(request, etag, None)
+    if unchanged is not None:
+        return unchanged
+    fast_response.headers.update(cache_headers(etag, None))
+    return fast_response
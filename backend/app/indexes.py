@@ -0,0 +1,189 @@
+"""
+Registro declarativo de índices de MongoDB.
+
+Cada consulta frecuente tiene un índice con la misma forma (igualdad, orden, rango).
+Uso por línea de comandos (desde backend/):
+
+    python -m app.indexes verify   # índices faltantes, sin uso ($indexStats) y no registrados
+    python -m app.indexes build    # construir los índices faltantes
+"""
+import asyncio
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+from app.database import database
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    name: str
+    keys: List[Tuple[str, int]]
+    unique: bool = False
+    partial_filter: Optional[Dict[str, Any]] = None
+    extra_options: Optional[Dict[str, Any]] = None
+
+    def options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"name": self.name, "background": True}
+        if self.unique:
+            options["unique"] = True
+        if self.partial_filter:
+            options["partialFilterExpression"] = self.partial_filter
+        if self.extra_options:
+            options.update(self.extra_options)
+        return options
+
+
+INDEXES: List[IndexSpec] = [
+    # Productos: búsqueda por ASIN (única)
+    IndexSpec("products", "asin_unique", [("asin", ASCENDING)], unique=True),
+    # GET /api/products/saved ordenado por updated_at (keyset por updated_at, _id)
+    IndexSpec("products", "updated_at_id", [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    # GET /api/products/saved?category=... (exacto o por prefijo) ordenado por updated_at
+    IndexSpec("products", "category_key_updated_at_id",
+              [("category_key", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    # Tarifas materializadas pendientes de recálculo
+    IndexSpec("products", "tariff_stale", [("tariff_stale", ASCENDING)], partial_filter={"tariff_stale": True}),
+
+    # Órdenes: búsqueda por número de orden (única)
+    IndexSpec("orders", "order_number_unique", [("order_number", ASCENDING)], unique=True),
+    # GET /api/orders ordenado por created_at (keyset por created_at, _id)
+    IndexSpec("orders", "created_at_id", [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    # GET /api/orders?status=...
+    IndexSpec("orders", "status_created_at_id",
+              [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    # GET /api/orders?customer_email=...
+    IndexSpec("orders", "customer_email_created_at_id",
+              [("customer_email", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    # GET /api/orders?q=... por prefijo de nombre, email o número (multikey)
+    IndexSpec("orders", "search_tokens_created_at_id",
+              [("search_tokens", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    # GET /api/orders?q=... por palabras completas, ordenado por relevancia
+    IndexSpec("orders", "customer_text",
+              [("customer_name", TEXT), ("customer_email", TEXT), ("search_tokens", TEXT)],
+              extra_options={"weights": {"customer_name": 5, "customer_email": 3, "search_tokens": 1},
+                             "default_language": "none"}),
+
+    # Resúmenes diarios de órdenes: filtros por rango de fechas en /api/analytics
+    IndexSpec("order_daily_rollups", "date", [("date", ASCENDING)]),
+]
+
+
+def _key_signature(keys) -> Tuple[Tuple[str, int], ...]:
+    return tuple((field, direction if isinstance(direction, str) else int(direction)) for field, direction in keys)
+
+
+async def _existing_indexes(collection_name: str) -> Dict[str, Dict[str, Any]]:
+    existing = await database[collection_name].index_information()
+    return {name: info for name, info in existing.items()}
+
+
+async def _duplicate_keys(spec: IndexSpec, sample: int = 5) -> List[Dict[str, Any]]:
+    """Valores repetidos de las claves de un índice único (una muestra), que impedirían crearlo"""
+    pipeline: List[Dict[str, Any]] = [{"$match": spec.partial_filter}] if spec.partial_filter else []
+    pipeline += [
+        {"$group": {"_id": {field.replace(".", "_"): f"${field}" for field, _ in spec.keys}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": sample},
+    ]
+    cursor = database[spec.collection].aggregate(pipeline, allowDiskUse=True)
+    return await cursor.to_list(length=sample)
+
+
+async def _restore_index(collection, name: str, info: Dict[str, Any]) -> None:
+    # Recrear un índice reemplazado con sus opciones originales
+    options = {key: value for key, value in info.items() if key not in ("key", "v", "ns")}
+    await collection.create_index(info["key"], name=name, **options)
+
+
+async def build_indexes(specs: List[IndexSpec] = INDEXES) -> Dict[str, List[str]]:
+    """
+    Crear los índices faltantes. Si ya existe un índice con las mismas claves pero
+    distinto nombre u opciones (p. ej. el antiguo asin_1 no único), se reemplaza.
+
+    Un índice único no se crea si la colección tiene duplicados: se informa en
+    "failed" y el índice anterior se mantiene. Si la creación falla después de
+    borrar el índice anterior, se vuelve a crear.
+    """
+    report: Dict[str, List[str]] = {"created": [], "replaced": [], "failed": []}
+    for spec in specs:
+        collection = database[spec.collection]
+        label = f"{spec.collection}.{spec.name}"
+        try:
+            existing = await _existing_indexes(spec.collection)
+            if spec.name in existing:
+                continue
+            if spec.unique:
+                duplicates = await _duplicate_keys(spec)
+                if duplicates:
+                    sample = ", ".join(f"{dup['_id']} x{dup['count']}" for dup in duplicates)
+                    report["failed"].append(f"{label}: claves duplicadas ({sample})")
+                    continue
+            # MongoDB no admite dos índices con las mismas claves: se borra el anterior
+            conflicting = {
+                name: info for name, info in existing.items()
+                if name != "_id_" and _key_signature(info["key"]) == _key_signature(spec.keys)
+            }
+            for name in conflicting:
+                await collection.drop_index(name)
+            try:
+                await collection.create_index(spec.keys, **spec.options())
+            except OperationFailure:
+                # p. ej. un duplicado escrito después de la verificación
+                for name, info in conflicting.items():
+                    await _restore_index(collection, name, info)
+                raise
+            report["replaced" if conflicting else "created"].append(label)
+        except OperationFailure as e:
+            report["failed"].append(f"{label}: {e}")
+    return report
+
+
+async def verify_indexes(specs: List[IndexSpec] = INDEXES) -> Dict[str, List[str]]:
+    """
+    Comparar los índices existentes con el registro:
+    faltantes, no registrados y sin uso desde el último reinicio ($indexStats).
+    """
+    report: Dict[str, List[str]] = {"missing": [], "unregistered": [], "unused": []}
+    for collection_name in sorted({spec.collection for spec in specs}):
+        registered = {spec.name for spec in specs if spec.collection == collection_name}
+        existing = await _existing_indexes(collection_name)
+
+        report["missing"].extend(f"{collection_name}.{name}" for name in sorted(registered - set(existing)))
+        report["unregistered"].extend(
+            f"{collection_name}.{name}" for name in sorted(set(existing) - registered - {"_id_"})
+        )
+
+        try:
+            stats = await database[collection_name].aggregate([{"$indexStats": {}}]).to_list(length=None)
+        except Exception:
+            # $indexStats no disponible (permisos o servidor de pruebas)
+            continue
+        report["unused"].extend(
+            f"{collection_name}.{stat['name']}" for stat in stats
+            if stat["name"] != "_id_" and stat.get("accesses", {}).get("ops", 0) == 0
+        )
+    return report
+
+
+def _print_report(title: str, report: Dict[str, List[str]]) -> None:
+    for key, items in report.items():
+        if items:
+            print(f"{title} - {key}: {', '.join(items)}")
+
+
+async def _main(command: str) -> int:
+    if command == "build":
+        report = await build_indexes()
+        _print_report("Índices", report)
+        return 1 if report["failed"] else 0
+    if command == "verify":
+        report = await verify_indexes()
+        _print_report("Índices", report)
+        return 1 if report["missing"] else 0
+    print("Uso: python -m app.indexes [build|verify]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "")))
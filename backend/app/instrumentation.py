@@ -0,0 +1,223 @@
+"""
+Instrumentación: histogramas de latencia con exportación en formato Prometheus.
+
+- MetricsMiddleware (ASGI): latencia y código de estado por ruta (plantilla de la ruta,
+  no la URL, para no crear una serie por cada ASIN u orden).
+- MongoCommandListener: latencia de cada comando de MongoDB por colección y operación.
+- timed(): tramos de código (cálculo de tarifas en lote, AmazonService) como decorador.
+  Se usa en puntos de entrada, no en funciones que se llaman una vez por item: las
+  rutas ya quedan medidas por MetricsMiddleware.
+- GET /metrics devuelve render_metrics() en formato de texto de Prometheus.
+
+Registrar una observación es una búsqueda binaria y tres sumas bajo un lock
+(los eventos de pymongo llegan desde los hilos de Motor).
+"""
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Tuple
+from pymongo import monitoring
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Límites superiores (segundos) de los buckets de latencia
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [conteo por bucket (+Inf al final), suma, total]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+
+        for labels, counts, total_sum, total_count in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {total_count}")
+            series_labels = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{series_labels} {total_sum}")
+            lines.append(f"{self.name}_count{series_labels} {total_count}")
+        return lines
+
+
+class Counter:
+    """Contador con etiquetas"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.label_names, labels)} {value}" for labels, value in snapshot)
+        return lines
+
+
+http_request_duration = Histogram(
+    "ibiztrack_http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route", "status")
+)
+mongo_command_duration = Histogram(
+    "ibiztrack_mongo_command_duration_seconds", "Latencia de los comandos de MongoDB",
+    ("collection", "command", "outcome")
+)
+span_duration = Histogram(
+    "ibiztrack_span_duration_seconds", "Latencia de tramos instrumentados", ("span", "outcome")
+)
+errors_total = Counter("ibiztrack_errors_total", "Errores registrados por componente", ("component",))
+
+METRICS = [http_request_duration, mongo_command_duration, span_duration, errors_total]
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+def record_error(component: str) -> None:
+    errors_total.inc((component,))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que registra latencia y código de estado por plantilla de ruta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                (scope["method"], getattr(route, "path", "unmatched"), status[0]),
+                time.perf_counter() - started
+            )
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Latencia de los comandos de MongoDB por colección y operación"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[Any, int], str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> Tuple[Any, int]:
+        return event.connection_id, event.request_id
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        # El nombre del comando lleva la colección (find, insert, ...); getMore la lleva en "collection"
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get("collection", "")
+        with self._lock:
+            self._collections[self._key(event)] = collection
+
+    def _finished(self, event, outcome: str) -> None:
+        with self._lock:
+            collection = self._collections.pop(self._key(event), "")
+        mongo_command_duration.observe(
+            (collection, event.command_name, outcome), event.duration_micros / 1_000_000
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finished(event, "ok")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finished(event, "error")
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+def timed(span: str) -> Callable:
+    """Decorador que registra la duración de una función (síncrona o async) como tramo"""
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    result = await func(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    span_duration.observe((span, outcome), time.perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                span_duration.observe((span, outcome), time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
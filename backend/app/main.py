@@ -1,12 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 #from backend.app.routes import products, orders
 #from backend.app.database import init_db
-from app.routes import products, orders
+from app.routes import products, orders, tariffs, analytics
 from app.database import init_db
+from app.instrumentation import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, render_metrics
+from app.services.amazon_service import AmazonService
+from app.services.rate_tables import get_rate_table
+from app.services.tariff_materializer import tariff_materializer
+from app.services.product_write_behind import product_write_behind, WRITE_BEHIND_ENABLED
 
 
-app = FastAPI(title="iBizTrack - Sistema de Gestión de Importaciones", version="1.0.0")
+app = FastAPI(
+    title="iBizTrack - Sistema de Gestión de Importaciones",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # Configurar CORS
 app.add_middleware(
@@ -15,21 +25,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Latencia y códigos de estado por ruta (ver /metrics)
+app.add_middleware(MetricsMiddleware)
+
 # Inicializar base de datos
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    # Compilar la tabla de tarifas SENAE al arrancar y actualizar en segundo plano
+    # las tarifas guardadas con otra versión
+    tariff_materializer.schedule_refresh(get_rate_table())
+    # Construir el catálogo indexado (o el cliente HTTP del proveedor) una sola vez al arrancar
+    AmazonService.get_provider()
+    if WRITE_BEHIND_ENABLED:
+        product_write_behind.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Guardar las escrituras pendientes antes de apagar
+    await product_write_behind.stop()
+    await AmazonService.close()
 
 # Incluir rutas
 app.include_router(products.router, prefix="/api/products", tags=["products"])
 app.include_router(orders.router, prefix="/api/orders", tags=["orders"])
+app.include_router(tariffs.router, prefix="/api/tariffs", tags=["tariffs"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 
 @app.get("/")
 async def root():
     return {"message": "iBizTrack API - iBusiness Ecuador"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
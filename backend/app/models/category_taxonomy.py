@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class TaxonomyCategory(BaseModel):
+    key: str = Field(..., description="Clave canónica; las subcategorías usan 'padre/hija'")
+    name: str = Field(..., description="Nombre para mostrar")
+    aliases: List[str] = Field(default_factory=list, description="Otros nombres con los que llega la categoría")
+
+
+class CategoryTaxonomyConfig(BaseModel):
+    version: str = Field(..., description="Versión de la taxonomía")
+    categories: List[TaxonomyCategory] = Field(..., description="Categorías canónicas")
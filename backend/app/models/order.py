@@ -26,6 +26,7 @@ class OrderItem(BaseModel):
     unit_price: float = Field(..., gt=0, description="Precio unitario en USD")
     weight: Optional[float] = Field(None, description="Peso unitario en kg")
     senae_category: SenaeCategory = Field(..., description="Categoría SENAE")
+    hs_code: Optional[str] = Field(None, description="Partida arancelaria")
     tariff_calculation: Optional[Dict] = Field(None, description="Cálculo de tarifas")
 
 
@@ -76,6 +77,20 @@ class OrderResponse(BaseModel):
     updated_at: datetime
 
 
+class OrderSummary(BaseModel):
+    id: str
+    order_number: str
+    customer_name: str
+    customer_email: str
+    status: OrderStatus
+    items_count: int
+    total_value: float
+    total_weight: float
+    total_taxes: float
+    created_at: datetime
+    updated_at: datetime
+
+
 class TariffCalculation(BaseModel):
     senae_category: SenaeCategory
     product_value: float
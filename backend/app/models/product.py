@@ -45,6 +45,18 @@ class ProductResponse(BaseModel):
     calculated_tariff: Optional[dict] = None
 
 
+class ProductSummary(BaseModel):
+    id: str
+    asin: str
+    title: str
+    price: float
+    weight: Optional[float]
+    image_url: Optional[str]
+    category: Optional[str]
+    senae_category: Optional[str] = None
+    total_cost: Optional[float] = None
+
+
 class ProductSearch(BaseModel):
     query: str = Field(..., description="Término de búsqueda")
     category: Optional[str] = Field(None, description="Categoría específica")
@@ -0,0 +1,50 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
+
+
+class AnnualLimit(BaseModel):
+    max_importations: int = Field(..., description="Máximo de importaciones al año para este límite")
+    limit: int = Field(..., description="Cupo anual en USD")
+
+
+class CategoryBRates(BaseModel):
+    max_weight: float = Field(..., description="Peso máximo en kg")
+    max_value: float = Field(..., description="Valor máximo en USD")
+    fixed_tariff: float = Field(..., description="Arancel fijo por importación en USD")
+    annual_limits: List[AnnualLimit] = Field(..., description="Cupos anuales según número de importaciones")
+
+
+class CategoryCRates(BaseModel):
+    max_weight: float = Field(..., description="Peso máximo en kg")
+    max_value: float = Field(..., description="Valor máximo en USD")
+    tariff_rate: float = Field(..., description="Arancel ad valorem por defecto")
+
+
+class CategoryDRates(BaseModel):
+    max_weight: float = Field(..., description="Peso máximo en kg")
+    max_value: float = Field(..., description="Valor máximo en USD")
+    adv_rate: float = Field(..., description="ADV por defecto")
+    inen_exemption_limit: int = Field(..., description="Valor hasta el cual no se requiere INEN")
+    keywords: List[str] = Field(..., description="Palabras que identifican prendas, textiles y calzado")
+
+
+class ProductTypeRates(BaseModel):
+    specific_per_kg: Optional[float] = Field(None, description="Tarifa específica en USD por kg")
+    specific_per_pair: Optional[float] = Field(None, description="Tarifa específica en USD por par")
+
+
+class HSCodeRates(BaseModel):
+    tariff_rate: Optional[float] = Field(None, description="Arancel ad valorem (categoría C)")
+    adv_rate: Optional[float] = Field(None, description="ADV (categoría D)")
+
+
+class RateTableConfig(BaseModel):
+    version: str = Field(..., description="Versión de la tabla de tarifas")
+    iva_rate: float = Field(..., description="Tasa de IVA")
+    fodinfa_rate: float = Field(..., description="Tasa FODINFA")
+    category_b: CategoryBRates
+    category_c: CategoryCRates
+    category_d: CategoryDRates
+    product_types: Dict[str, ProductTypeRates] = Field(..., description="Tarifas específicas por tipo de producto")
+    default_product_type: str = Field(..., description="Tipo de producto usado si no hay coincidencia")
+    hs_codes: Dict[str, HSCodeRates] = Field(default_factory=dict, description="Tarifas por partida arancelaria")
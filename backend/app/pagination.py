@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+# Cabecera con el cursor de la página siguiente (el cuerpo sigue siendo una lista)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: datetime, doc_id: ObjectId) -> str:
+    """Cursor opaco a partir de la clave de orden y el _id del último documento"""
+    payload = json.dumps({"v": sort_value.isoformat(), "id": str(doc_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Decodificar un cursor; lanza HTTPException 400 si no es válido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["v"]), ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+
+def keyset_query(filter_query: Dict[str, Any], sort_field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    Agregar al filtro la condición de keyset para orden descendente por (sort_field, _id):
+    solo documentos posteriores al cursor, usando el índice en lugar de skip().
+    """
+    if not cursor:
+        return filter_query
+    sort_value, doc_id = decode_cursor(cursor)
+    after_cursor = {"$or": [
+        {sort_field: {"$lt": sort_value}},
+        {sort_field: sort_value, "_id": {"$lt": doc_id}}
+    ]}
+    return {"$and": [filter_query, after_cursor]} if filter_query else after_cursor
+
+
+def keyset_sort(sort_field: str) -> List[Tuple[str, int]]:
+    """Orden descendente por la clave y _id como desempate (orden total y estable)"""
+    return [(sort_field, -1), ("_id", -1)]
+
+
+def next_cursor(docs: List[Dict[str, Any]], sort_field: str, limit: int) -> Optional[str]:
+    """Cursor de la página siguiente, o None si esta fue la última"""
+    if len(docs) < limit or not docs:
+        return None
+    last = docs[-1]
+    return encode_cursor(last[sort_field], last["_id"])
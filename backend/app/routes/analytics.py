@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException, Query
+from datetime import datetime
+from typing import Optional
+from app.services import order_analytics
+
+router = APIRouter()
+
+
+@router.get("/summary")
+async def get_summary(
+        date_from: Optional[datetime] = Query(None, description="Desde (fecha de creación)"),
+        date_to: Optional[datetime] = Query(None, description="Hasta (fecha de creación)")
+):
+    """Totales de órdenes (cantidad, valor, peso e impuestos) del período"""
+    try:
+        return await order_analytics.get_summary(date_from, date_to)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener resumen: {str(e)}")
+
+
+@router.get("/by-status")
+async def get_totals_by_status(
+        date_from: Optional[datetime] = Query(None, description="Desde (fecha de creación)"),
+        date_to: Optional[datetime] = Query(None, description="Hasta (fecha de creación)")
+):
+    """Totales de órdenes agrupados por estado"""
+    try:
+        return await order_analytics.get_totals_by_status(date_from, date_to)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener totales por estado: {str(e)}")
+
+
+@router.get("/by-category")
+async def get_totals_by_category(
+        date_from: Optional[datetime] = Query(None, description="Desde (fecha de creación)"),
+        date_to: Optional[datetime] = Query(None, description="Hasta (fecha de creación)")
+):
+    """Totales de items agrupados por categoría SENAE"""
+    try:
+        return await order_analytics.get_totals_by_category(date_from, date_to)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener totales por categoría: {str(e)}")
+
+
+@router.get("/daily")
+async def get_daily_totals(
+        date_from: Optional[datetime] = Query(None, description="Desde (fecha de creación)"),
+        date_to: Optional[datetime] = Query(None, description="Hasta (fecha de creación)"),
+        limit: int = Query(31, ge=1, le=366, description="Número máximo de días")
+):
+    """Totales de órdenes por día (los más recientes primero)"""
+    try:
+        return await order_analytics.get_daily_totals(date_from, date_to, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener totales diarios: {str(e)}")
+
+
+@router.post("/rollups/rebuild")
+async def rebuild_rollups():
+    """Reconstruir los resúmenes diarios desde la colección de órdenes"""
+    try:
+        return await order_analytics.rebuild_rollups()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al reconstruir resúmenes: {str(e)}")
@@ -1,30 +1,64 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
 from datetime import datetime
-import uuid
 from bson import ObjectId
+from pymongo import ReturnDocument
 #from backend.app.models.order import Order, OrderResponse, OrderItem, OrderStatus, TariffCalculation
 #from backend.app.services.senae_calculator import SenaeCalculator
 #from backend.app.services.amazon_service import AmazonService
 #from backend.app.database import orders_collection
 
-from app.models.order import Order, OrderResponse, OrderItem, OrderStatus, TariffCalculation
-from app.services.senae_calculator import SenaeCalculator
+from app.models.order import Order, OrderResponse, OrderSummary, OrderItem, OrderStatus, TariffCalculation
+from app.services.senae_calculator import SenaeCalculator, is_number
 from app.services.amazon_service import AmazonService
 from app.database import orders_collection
+from app.services import order_analytics
+from app.services.order_search import search_orders, backfill_search_tokens
+from app.services.order_import import (
+    ORDER_IMPORT_CHUNK_SIZE, OrderImporter, build_order_docs, import_csv, import_json, import_ndjson, utcnow
+)
+from app.services.order_export import (
+    EXPORT_BATCH_SIZE, EXPORT_FORMATS, export_chunks, export_filename, iter_row_batches, parquet_available
+)
+from app.streaming import (
+    CSV_MEDIA_TYPE, NDJSON_MEDIA_TYPE, NDJSONStreamingResponse, iter_csv, iter_ndjson, ndjson_line
+)
+from app.serialization import trusted_response
+from app.http_cache import (
+    cached_response, documents_etag, has_validators, last_modified, modified_at, not_modified, validator_projection
+)
+from app.pagination import NEXT_CURSOR_HEADER, keyset_query, keyset_sort, next_cursor
+from app.instrumentation import record_error
 
 router = APIRouter()
 
 
+async def _record_analytics(update, *args) -> None:
+    """Actualizar los resúmenes diarios sin hacer fallar la operación sobre la orden"""
+    try:
+        await update(*args)
+    except Exception as e:
+        record_error("order_analytics")
+        print(f"Error al actualizar resúmenes de órdenes: {e}")
+
+
+# Campos de OrderItem en la respuesta (los items guardados antes de hs_code no lo tienen)
+ORDER_ITEM_FIELDS = tuple(OrderItem.model_fields)
+
+# Proyección de las lecturas de órdenes: lo que usa order_helper
+ORDER_RESPONSE_PROJECTION = {"search_tokens": 0}
+
+
 def order_helper(order) -> dict:
-    """Helper para convertir documentos de MongoDB"""
+    """Helper para convertir documentos de MongoDB (con la forma exacta de OrderResponse)"""
     return {
         "id": str(order["_id"]),
         "order_number": order["order_number"],
         "customer_name": order["customer_name"],
         "customer_email": order["customer_email"],
         "customer_cedula": order["customer_cedula"],
-        "items": order["items"],
+        "items": [{field: item.get(field) for field in ORDER_ITEM_FIELDS} for item in order["items"]],
         "shipping_address": order["shipping_address"],
         "notes": order.get("notes", ""),
         "status": order["status"],
@@ -36,101 +70,129 @@ def order_helper(order) -> dict:
     }
 
 
+# Proyección de los listados resumidos (view=summary): de los items solo se lee
+# la cantidad para contarlos, sin sus cálculos de tarifas
+ORDER_SUMMARY_PROJECTION = {
+    "order_number": 1,
+    "customer_name": 1,
+    "customer_email": 1,
+    "status": 1,
+    "items.quantity": 1,
+    "total_value": 1,
+    "total_weight": 1,
+    "total_tariffs.total_taxes": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+
+def order_summary_helper(order) -> dict:
+    """Helper para convertir documentos proyectados con ORDER_SUMMARY_PROJECTION (forma de OrderSummary)"""
+    return {
+        "id": str(order["_id"]),
+        "order_number": order["order_number"],
+        "customer_name": order["customer_name"],
+        "customer_email": order["customer_email"],
+        "status": order["status"],
+        "items_count": len(order.get("items", [])),
+        "total_value": order["total_value"],
+        "total_weight": order["total_weight"],
+        "total_taxes": order.get("total_tariffs", {}).get("total_taxes", 0.0),
+        "created_at": order["created_at"],
+        "updated_at": order["updated_at"]
+    }
+
+
+# Vistas de los listados: proyección en MongoDB y helper de la respuesta
+ORDER_VIEWS = {
+    "full": (ORDER_RESPONSE_PROJECTION, order_helper),
+    "summary": (ORDER_SUMMARY_PROJECTION, order_summary_helper)
+}
+
+
 @router.post("/", response_model=OrderResponse)
 async def create_order(order: Order):
     """Crear nueva orden de compra"""
     try:
-        # Generar número de orden único
-        order_number = f"IBT-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
-
-        # Calcular totales y tarifas para cada item
-        total_value = 0
-        total_weight = 0
-        total_tariffs = {
-            "total_tariff": 0,
-            "total_iva": 0,
-            "total_fodinfa": 0,
-            "total_adv": 0,
-            "total_taxes": 0
-        }
+        # Calcular totales y tarifas de todos los items en un solo paso vectorizado
+        order_doc = build_order_docs([order])[0]
 
-        processed_items = []
-
-        for item in order.items:
-            # Calcular tarifa para cada item
-            item_total_value = item.unit_price * item.quantity
-            item_total_weight = (item.weight or 1.0) * item.quantity
-
-            tariff_calculation = SenaeCalculator.calculate_tariff(
-                item.senae_category,
-                item_total_value,
-                item_total_weight,
-                product_type="textiles" if item.senae_category.value == "D" else "general"
-            )
-
-            # Actualizar item con cálculo de tarifa
-            processed_item = item.dict()
-            processed_item["tariff_calculation"] = tariff_calculation
-            processed_items.append(processed_item)
-
-            # Sumar a totales
-            total_value += item_total_value
-            total_weight += item_total_weight
-
-            if "total_tariff" in tariff_calculation:
-                total_tariffs["total_tariff"] += tariff_calculation.get("total_tariff", 0)
-            if "tariff" in tariff_calculation:
-                total_tariffs["total_tariff"] += tariff_calculation.get("tariff", 0)
-
-            total_tariffs["total_iva"] += tariff_calculation.get("iva", 0)
-            total_tariffs["total_fodinfa"] += tariff_calculation.get("fodinfa", 0)
-            total_tariffs["total_adv"] += tariff_calculation.get("adv", 0)
-
-        # Calcular total de impuestos
-        total_tariffs["total_taxes"] = (
-                total_tariffs["total_tariff"] +
-                total_tariffs["total_iva"] +
-                total_tariffs["total_fodinfa"] +
-                total_tariffs["total_adv"]
-        )
+        # Insertar en base de datos (insert_one agrega el _id al documento, que se
+        # devuelve directamente sin volver a leerlo)
+        await orders_collection.insert_one(order_doc)
+        await _record_analytics(order_analytics.record_order_created, order_doc)
+
+        return trusted_response(order_helper(order_doc))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al crear orden: {str(e)}")
 
-        # Crear documento de orden
-        order_doc = {
-            "order_number": order_number,
-            "customer_name": order.customer_name,
-            "customer_email": order.customer_email,
-            "customer_cedula": order.customer_cedula,
-            "items": processed_items,
-            "shipping_address": order.shipping_address,
-            "notes": order.notes,
-            "status": OrderStatus.DRAFT.value,
-            "total_value": round(total_value, 2),
-            "total_weight": round(total_weight, 2),
-            "total_tariffs": total_tariffs,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
 
-        # Insertar en base de datos
-        result = await orders_collection.insert_one(order_doc)
+@router.post("/bulk")
+async def create_orders_bulk(
+        request: Request,
+        chunk_size: int = Query(ORDER_IMPORT_CHUNK_SIZE, ge=1, le=10000, description="Órdenes insertadas por lote")
+):
+    """
+    Crear órdenes en lote desde una lista JSON, NDJSON (una orden por línea) o CSV.
 
-        # Obtener orden creada
-        new_order = await orders_collection.find_one({"_id": result.inserted_id})
+    En CSV cada fila es un item con las columnas de la orden (customer_name, customer_email,
+    customer_cedula, shipping_address, notes) y del item (product_asin, product_title, quantity,
+    unit_price, weight, senae_category, hs_code); las filas consecutivas con el mismo
+    `order_ref` forman una orden. NDJSON y CSV se leen en streaming.
 
-        return OrderResponse(**order_helper(new_order))
+    Las tarifas de cada lote se calculan en un solo paso y se insertan con
+    insert_many(ordered=False). La respuesta tiene el resultado de cada orden.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    importer = OrderImporter(chunk_size)
 
+    try:
+        if content_type == CSV_MEDIA_TYPE:
+            await import_csv(importer, iter_csv(request))
+        elif content_type == NDJSON_MEDIA_TYPE:
+            await import_ndjson(importer, iter_ndjson(request))
+        else:
+            try:
+                orders = await request.json()
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"JSON inválido: {str(e)}")
+            await import_json(importer, orders)
+
+        return importer.report()
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al crear orden: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al importar órdenes: {str(e)}")
 
 
-@router.get("/", response_model=List[OrderResponse])
+@router.get("/", response_model=Union[List[OrderResponse], List[OrderSummary]])
 async def get_orders(
+        request: Request,
+        response: Response,
         status: Optional[str] = Query(None, description="Filtrar por estado"),
         customer_email: Optional[str] = Query(None, description="Filtrar por email del cliente"),
+        q: Optional[str] = Query(None, min_length=2, max_length=100,
+                                 description="Buscar por número de orden, nombre o email del cliente"),
         limit: int = Query(10, ge=1, le=100, description="Límite de resultados"),
-        skip: int = Query(0, ge=0, description="Omitir resultados")
+        skip: int = Query(0, ge=0, description="Omitir resultados"),
+        cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor)"),
+        view: str = Query("full", pattern="^(full|summary)$",
+                          description="full: orden completa; summary: campos del listado, sin items")
 ):
-    """Obtener órdenes con filtros opcionales"""
+    """
+    Obtener órdenes con filtros opcionales.
+
+    Para paginar sin skip usar `cursor` con el valor de la cabecera X-Next-Cursor
+    de la respuesta anterior: cada página cuesta lo mismo sin importar su posición.
+    Con `q` los resultados se ordenan por relevancia y se paginan con skip.
+    Con `view=summary` MongoDB devuelve solo los campos de OrderSummary. Sin `q` la
+    respuesta lleva ETag y Last-Modified: si la página no cambió se responde 304
+    leyendo solo el _id y las fechas de sus órdenes.
+    """
     try:
         # Construir filtro
         filter_query = {}
@@ -139,26 +201,120 @@ async def get_orders(
         if customer_email:
             filter_query["customer_email"] = customer_email
 
-        # Ejecutar consulta
-        cursor = orders_collection.find(filter_query).sort("created_at", -1).skip(skip).limit(limit)
-        orders = await cursor.to_list(length=limit)
+        projection, helper = ORDER_VIEWS[view]
+
+        if q:
+            orders = await search_orders(q, filter_query, skip, limit, projection)
+            return trusted_response([helper(order) for order in orders])
+
+        # Ejecutar consulta (keyset si hay cursor; skip se mantiene por compatibilidad)
+        query = keyset_query(filter_query, "created_at", cursor)
+
+        if has_validators(request):
+            # Revalidación: leer solo _id y fechas de la página antes que los documentos completos
+            db_cursor = orders_collection.find(query, validator_projection("created_at"))
+            db_cursor = db_cursor.sort(keyset_sort("created_at")).skip(skip).limit(limit)
+            keys = await db_cursor.to_list(length=limit)
+
+            unchanged = not_modified(request, documents_etag(keys, view), last_modified(keys))
+            if unchanged is not None:
+                following = next_cursor(keys, "created_at", limit)
+                if following:
+                    unchanged.headers[NEXT_CURSOR_HEADER] = following
+                return unchanged
 
-        return [OrderResponse(**order_helper(order)) for order in orders]
+        db_cursor = orders_collection.find(query, projection)
+        db_cursor = db_cursor.sort(keyset_sort("created_at")).skip(skip).limit(limit)
+        orders = await db_cursor.to_list(length=limit)
 
+        following = next_cursor(orders, "created_at", limit)
+        if following:
+            response.headers[NEXT_CURSOR_HEADER] = following
+
+        return cached_response(
+            request, documents_etag(orders, view), last_modified(orders),
+            lambda: [helper(order) for order in orders], response
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener órdenes: {str(e)}")
 
 
+@router.post("/search/backfill")
+async def backfill_order_search():
+    """Calcular los tokens de búsqueda de las órdenes guardadas antes de la búsqueda por q"""
+    try:
+        return await backfill_search_tokens()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al indexar órdenes: {str(e)}")
+
+
+@router.get("/export")
+async def export_orders(
+        format: str = Query("csv", pattern="^(csv|ndjson|parquet)$", description="csv, ndjson o parquet"),
+        status: Optional[str] = Query(None, description="Filtrar por estado"),
+        customer_email: Optional[str] = Query(None, description="Filtrar por email del cliente"),
+        date_from: Optional[datetime] = Query(None, description="Creadas desde"),
+        date_to: Optional[datetime] = Query(None, description="Creadas hasta"),
+        batch_size: int = Query(EXPORT_BATCH_SIZE, ge=100, le=20000, description="Documentos por lote del cursor")
+):
+    """
+    Exportar órdenes en streaming, una fila por item con sus tarifas en columnas.
+
+    Se escribe a medida que se lee el cursor, así la memoria no crece con el número
+    de órdenes. Parquet requiere pyarrow instalado.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="La exportación a Parquet requiere pyarrow")
+
+    filter_query = {}
+    if status:
+        filter_query["status"] = status
+    if customer_email:
+        filter_query["customer_email"] = customer_email
+    if date_from or date_to:
+        filter_query["created_at"] = {}
+        if date_from:
+            filter_query["created_at"]["$gte"] = date_from
+        if date_to:
+            filter_query["created_at"]["$lte"] = date_to
+
+    batches = iter_row_batches(orders_collection, filter_query, batch_size)
+    media_type, _ = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_chunks(format, batches),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(format)}"'}
+    )
+
+
 @router.get("/{order_id}", response_model=OrderResponse)
-async def get_order_by_id(order_id: str):
-    """Obtener orden por ID"""
+async def get_order_by_id(order_id: str, request: Request):
+    """
+    Obtener orden por ID.
+
+    La respuesta lleva ETag y Last-Modified: si la orden no cambió se responde 304
+    leyendo solo sus fechas, sin los items.
+    """
     try:
-        order = await orders_collection.find_one({"_id": ObjectId(order_id)})
+        if has_validators(request):
+            # Revalidación: leer solo las fechas de la orden antes que el documento completo
+            dates = await orders_collection.find_one({"_id": ObjectId(order_id)}, validator_projection())
+            if dates:
+                unchanged = not_modified(request, documents_etag([dates]), modified_at(dates))
+                if unchanged is not None:
+                    return unchanged
+
+        order = await orders_collection.find_one({"_id": ObjectId(order_id)}, ORDER_RESPONSE_PROJECTION)
         if not order:
             raise HTTPException(status_code=404, detail="Orden no encontrada")
 
-        return OrderResponse(**order_helper(order))
+        return cached_response(request, documents_etag([order]), modified_at(order), lambda: order_helper(order))
 
+    except HTTPException:
+        raise
     except Exception as e:
         if "not a valid ObjectId" in str(e):
             raise HTTPException(status_code=400, detail="ID de orden inválido")
@@ -169,11 +325,11 @@ async def get_order_by_id(order_id: str):
 async def get_order_by_number(order_number: str):
     """Obtener orden por número de orden"""
     try:
-        order = await orders_collection.find_one({"order_number": order_number})
+        order = await orders_collection.find_one({"order_number": order_number}, ORDER_RESPONSE_PROJECTION)
         if not order:
             raise HTTPException(status_code=404, detail="Orden no encontrada")
 
-        return OrderResponse(**order_helper(order))
+        return trusted_response(order_helper(order))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener orden: {str(e)}")
@@ -183,23 +339,33 @@ async def get_order_by_number(order_number: str):
 async def update_order_status(order_id: str, status: OrderStatus):
     """Actualizar estado de la orden"""
     try:
-        result = await orders_collection.update_one(
+        # Una sola ida y vuelta: find_one_and_update devuelve el documento previo
+        # (necesario para mover la orden entre estados en los resúmenes) y la
+        # respuesta se arma aplicando el cambio en memoria
+        updated_at = utcnow()
+        previous_order = await orders_collection.find_one_and_update(
             {"_id": ObjectId(order_id)},
             {
                 "$set": {
                     "status": status.value,
-                    "updated_at": datetime.utcnow()
+                    "updated_at": updated_at
                 }
-            }
+            },
+            return_document=ReturnDocument.BEFORE
         )
 
-        if result.matched_count == 0:
+        if previous_order is None:
             raise HTTPException(status_code=404, detail="Orden no encontrada")
 
-        # Obtener orden actualizada
-        updated_order = await orders_collection.find_one({"_id": ObjectId(order_id)})
-        return OrderResponse(**order_helper(updated_order))
+        await _record_analytics(
+            order_analytics.record_status_change, previous_order, previous_order["status"], status.value
+        )
+
+        updated_order = {**previous_order, "status": status.value, "updated_at": updated_at}
+        return trusted_response(order_helper(updated_order))
 
+    except HTTPException:
+        raise
     except Exception as e:
         if "not a valid ObjectId" in str(e):
             raise HTTPException(status_code=400, detail="ID de orden inválido")
@@ -210,13 +376,17 @@ async def update_order_status(order_id: str, status: OrderStatus):
 async def delete_order(order_id: str):
     """Eliminar orden"""
     try:
-        result = await orders_collection.delete_one({"_id": ObjectId(order_id)})
+        deleted_order = await orders_collection.find_one_and_delete({"_id": ObjectId(order_id)})
 
-        if result.deleted_count == 0:
+        if deleted_order is None:
             raise HTTPException(status_code=404, detail="Orden no encontrada")
 
+        await _record_analytics(order_analytics.record_order_deleted, deleted_order)
+
         return {"message": "Orden eliminada exitosamente"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         if "not a valid ObjectId" in str(e):
             raise HTTPException(status_code=400, detail="ID de orden inválido")
@@ -225,51 +395,121 @@ async def delete_order(order_id: str):
 
 @router.post("/calculate-bulk-tariff")
 async def calculate_bulk_tariff(items: List[dict]):
-    """Calcular tarifas para múltiples productos"""
-    try:
-        calculations = []
-        total_tariffs = {
-            "total_tariff": 0,
-            "total_iva": 0,
-            "total_fodinfa": 0,
-            "total_adv": 0,
-            "total_taxes": 0
-        }
+    """
+    Calcular tarifas para múltiples productos.
 
-        for item in items:
-            tariff_calculation = SenaeCalculator.calculate_tariff(
-                item["senae_category"],
-                item["total_value"],
-                item["total_weight"],
-                product_type=item.get("product_type", "general")
-            )
+    Los items se validan igual que en /calculate-bulk-tariff/stream: uno inválido
+    recibe {"error": ...} como tariff_calculation y no suma a los totales.
+    """
+    try:
+        errors = [_validate_bulk_item(item) for item in items]
+        valid = [item for item, error in zip(items, errors) if error is None]
+        batch = SenaeCalculator.calculate_tariff_batch(
+            [item["senae_category"] for item in valid],
+            [item["total_value"] for item in valid],
+            [item["total_weight"] for item in valid],
+            product_types=[item.get("product_type", "general") for item in valid],
+            hs_codes=[item.get("hs_code") for item in valid]
+        )
 
-            calculations.append({
+        valid_calculations = iter(batch["calculations"])
+        calculations = [
+            {
                 "item": item,
-                "tariff_calculation": tariff_calculation
-            })
-
-            # Sumar a totales
-            if "total_tariff" in tariff_calculation:
-                total_tariffs["total_tariff"] += tariff_calculation.get("total_tariff", 0)
-            if "tariff" in tariff_calculation:
-                total_tariffs["total_tariff"] += tariff_calculation.get("tariff", 0)
-
-            total_tariffs["total_iva"] += tariff_calculation.get("iva", 0)
-            total_tariffs["total_fodinfa"] += tariff_calculation.get("fodinfa", 0)
-            total_tariffs["total_adv"] += tariff_calculation.get("adv", 0)
-
-        total_tariffs["total_taxes"] = (
-                total_tariffs["total_tariff"] +
-                total_tariffs["total_iva"] +
-                total_tariffs["total_fodinfa"] +
-                total_tariffs["total_adv"]
-        )
+                "tariff_calculation": {"error": error} if error else next(valid_calculations)
+            }
+            for item, error in zip(items, errors)
+        ]
 
         return {
             "items_calculations": calculations,
-            "total_tariffs": total_tariffs
+            "total_tariffs": batch["total_tariffs"]
         }
 
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error al calcular tarifas: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"Error al calcular tarifas: {str(e)}")
+
+
+def _validate_bulk_item(item) -> Optional[str]:
+    """Validar un item del manifiesto; devuelve el mensaje de error o None"""
+    if not isinstance(item, dict):
+        return "Cada línea debe ser un objeto JSON"
+    for field in ("senae_category", "total_value", "total_weight"):
+        if field not in item:
+            return f"Falta el campo requerido: {field}"
+    for field in ("total_value", "total_weight"):
+        if not is_number(item[field]):
+            return f"El campo {field} debe ser numérico"
+    return None
+
+
+@router.post("/calculate-bulk-tariff/stream", response_class=NDJSONStreamingResponse)
+async def calculate_bulk_tariff_stream(
+        request: Request,
+        chunk_size: int = Query(500, ge=1, le=10000, description="Items calculados por lote")
+):
+    """
+    Calcular tarifas para un manifiesto NDJSON (un item por línea) en streaming.
+
+    Cada item se responde en su propia línea apenas se calcula su lote y al final
+    se envía un registro con los totales acumulados, sin cargar el manifiesto en memoria.
+    Si el manifiesto no se puede seguir leyendo (p. ej. una línea demasiado larga) la
+    respuesta termina con un registro `fatal` y sin totales.
+    """
+
+    def calculate_chunk(pending: list, summary: dict) -> str:
+        batch = SenaeCalculator.calculate_tariff_batch(
+            [item["senae_category"] for _, item in pending],
+            [item["total_value"] for _, item in pending],
+            [item["total_weight"] for _, item in pending],
+            product_types=[item.get("product_type", "general") for _, item in pending],
+            hs_codes=[item.get("hs_code") for _, item in pending]
+        )
+        summary["total_tariffs"] = SenaeCalculator.summarize_tariffs(
+            batch["calculations"], summary["total_tariffs"]
+        )
+        summary["items_count"] += len(pending)
+        return "".join(
+            ndjson_line({
+                "type": "item",
+                "line": line_number,
+                "item": item,
+                "tariff_calculation": tariff_calculation
+            })
+            for (line_number, item), tariff_calculation in zip(pending, batch["calculations"])
+        )
+
+    async def generate():
+        summary = {"items_count": 0, "errors_count": 0, "total_tariffs": None}
+        pending = []
+
+        try:
+            async for line_number, item, error in iter_ndjson(request):
+                error = error or _validate_bulk_item(item)
+                if error:
+                    summary["errors_count"] += 1
+                    yield ndjson_line({"type": "error", "line": line_number, "error": error})
+                    continue
+
+                pending.append((line_number, item))
+                if len(pending) >= chunk_size:
+                    yield calculate_chunk(pending, summary)
+                    pending = []
+        except HTTPException as e:
+            # El estado 200 ya se envió: el error va en el propio stream
+            if pending:
+                yield calculate_chunk(pending, summary)
+            yield ndjson_line({"type": "fatal", "error": e.detail})
+            return
+
+        if pending:
+            yield calculate_chunk(pending, summary)
+
+        yield ndjson_line({
+            "type": "totals",
+            "items_count": summary["items_count"],
+            "errors_count": summary["errors_count"],
+            "total_tariffs": summary["total_tariffs"] or SenaeCalculator.summarize_tariffs([])
+        })
+
+    return NDJSONStreamingResponse(generate())
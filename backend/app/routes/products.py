@@ -1,17 +1,30 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-from app.models.product import Product, ProductResponse, ProductSearch
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional, Union
+from app.models.product import Product, ProductResponse, ProductSummary, ProductSearch
 from app.services.amazon_service import AmazonService
 from app.services.senae_calculator import SenaeCalculator
+from app.services.tariff_cache import tariff_cache
+from app.services.single_flight import SingleFlight
+from app.services.product_cache import product_cache
+from app.services.product_persistence import save_products_to_db
+from app.services.product_write_behind import persist_products, product_write_behind
+from app.services.category_taxonomy import backfill_category_keys, category_taxonomy
 from app.database import products_collection
 from app.models.order import SenaeCategory
-import datetime
+from app.http_cache import (
+    cached_response, documents_etag, has_validators, hashed_response, last_modified, modified_at,
+    not_modified, validator_projection
+)
+from app.pagination import NEXT_CURSOR_HEADER, keyset_query, keyset_sort, next_cursor
 
 router = APIRouter()
 
+# Coalescencia de búsquedas concurrentes del mismo ASIN que no está en la base de datos
+product_lookups = SingleFlight()
+
 
 def product_helper(product) -> dict:
-    """Helper para convertir documentos de MongoDB"""
+    """Helper para convertir documentos de MongoDB (con la forma exacta de ProductResponse)"""
     return {
         "id": str(product["_id"]),
         "asin": product["asin"],
@@ -28,42 +41,47 @@ def product_helper(product) -> dict:
     }
 
 
-async def save_product_to_db(product: Product, senae_category: str, tariff_calculation: dict):
-    """Guardar producto en MongoDB"""
-    try:
-        # Verificar si el producto ya existe
-        existing_product = await products_collection.find_one({"asin": product.asin})
-
-        product_doc = {
-            "asin": product.asin,
-            "title": product.title,
-            "price": product.price,
-            "weight": product.weight,
-            "dimensions": product.dimensions,
-            "image_url": product.image_url,
-            "category": product.category,
-            "description": product.description,
-            "availability": product.availability,
-            "senae_category": senae_category,
-            "calculated_tariff": tariff_calculation,
-            "created_at": datetime.datetime.utcnow(),
-            "updated_at": datetime.datetime.utcnow()
-        }
+# Proyección de los listados resumidos (view=summary): del cálculo de tarifas
+# solo el costo total, sin descripción ni dimensiones
+PRODUCT_SUMMARY_PROJECTION = {
+    "asin": 1,
+    "title": 1,
+    "price": 1,
+    "weight": 1,
+    "image_url": 1,
+    "category": 1,
+    "senae_category": 1,
+    "calculated_tariff.total_cost": 1,
+    "updated_at": 1
+}
 
-        if existing_product:
-            # Actualizar producto existente
-            await products_collection.update_one(
-                {"asin": product.asin},
-                {"$set": {**product_doc, "updated_at": datetime.datetime.utcnow()}}
-            )
-        else:
-            # Insertar nuevo producto
-            await products_collection.insert_one(product_doc)
 
-        return True
-    except Exception as e:
-        print(f"Error guardando producto en DB: {e}")
-        return False
+def product_summary_helper(product) -> dict:
+    """Helper para convertir documentos proyectados con PRODUCT_SUMMARY_PROJECTION (forma de ProductSummary)"""
+    return {
+        "id": str(product["_id"]),
+        "asin": product["asin"],
+        "title": product["title"],
+        "price": product["price"],
+        "weight": product.get("weight"),
+        "image_url": product.get("image_url"),
+        "category": product.get("category"),
+        "senae_category": product.get("senae_category"),
+        "total_cost": (product.get("calculated_tariff") or {}).get("total_cost")
+    }
+
+
+# Vistas de los listados: proyección en MongoDB y helper de la respuesta
+PRODUCT_VIEWS = {
+    "full": (None, product_helper),
+    "summary": (PRODUCT_SUMMARY_PROJECTION, product_summary_helper)
+}
+
+
+async def save_product_to_db(product: Product, senae_category: str, tariff_calculation: dict):
+    """Guardar producto en MongoDB"""
+    result = await persist_products([(product, senae_category, tariff_calculation)])
+    return result is None or not result["failed"]
 
 
 @router.get("/search", response_model=List[ProductResponse])
@@ -79,6 +97,7 @@ async def search_products(
 
         # Enriquecer con cálculos SENAE y guardar en DB
         response_products = []
+        to_save = []
         for product in products:
             # Determinar categoría SENAE automáticamente
             senae_category = SenaeCalculator.determine_category(
@@ -88,15 +107,14 @@ async def search_products(
             )
 
             # Calcular tarifa
-            tariff_calculation = SenaeCalculator.calculate_tariff(
+            tariff_calculation = tariff_cache.calculate_tariff(
                 senae_category,
                 product.price,
                 product.weight or 1.0,
                 product_type=product.category or "general"
             )
 
-            # Guardar en MongoDB
-            await save_product_to_db(product, senae_category.value, tariff_calculation)
+            to_save.append((product, senae_category.value, tariff_calculation))
 
             response_product = ProductResponse(
                 id=product.asin,
@@ -114,6 +132,9 @@ async def search_products(
             )
             response_products.append(response_product)
 
+        # Guardar todos los productos en MongoDB con un solo bulk_write (o en segundo plano)
+        await persist_products(to_save)
+
         return response_products
 
     except Exception as e:
@@ -127,6 +148,7 @@ async def get_trending_products(limit: int = Query(5, ge=1, le=20)):
         products = await AmazonService.get_trending_products(limit)
 
         response_products = []
+        to_save = []
         for product in products:
             senae_category = SenaeCalculator.determine_category(
                 product.price,
@@ -134,15 +156,14 @@ async def get_trending_products(limit: int = Query(5, ge=1, le=20)):
                 product.category or ""
             )
 
-            tariff_calculation = SenaeCalculator.calculate_tariff(
+            tariff_calculation = tariff_cache.calculate_tariff(
                 senae_category,
                 product.price,
                 product.weight or 1.0,
                 product_type=product.category or "general"
             )
 
-            # Guardar en MongoDB
-            await save_product_to_db(product, senae_category.value, tariff_calculation)
+            to_save.append((product, senae_category.value, tariff_calculation))
 
             response_product = ProductResponse(
                 id=product.asin,
@@ -160,96 +181,194 @@ async def get_trending_products(limit: int = Query(5, ge=1, le=20)):
             )
             response_products.append(response_product)
 
+        # Guardar todos los productos en MongoDB con un solo bulk_write (o en segundo plano)
+        await persist_products(to_save)
+
         return response_products
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener productos trending: {str(e)}")
 
 
-@router.get("/saved", response_model=List[ProductResponse])
+@router.get("/write-behind/metrics")
+async def get_write_behind_metrics():
+    """Métricas de la cola write-behind de productos"""
+    return product_write_behind.metrics()
+
+
+@router.get("/tariff-cache/metrics")
+async def get_tariff_cache_metrics():
+    """Métricas de la caché de cálculos de tarifas"""
+    return tariff_cache.metrics()
+
+
+@router.delete("/tariff-cache")
+async def invalidate_tariff_cache():
+    """Vaciar la caché de cálculos de tarifas (p. ej. tras cambiar las tarifas)"""
+    return {"invalidated": tariff_cache.invalidate()}
+
+
+@router.get("/lookups/metrics")
+async def get_lookup_metrics():
+    """Métricas de coalescencia de búsquedas por ASIN"""
+    return product_lookups.metrics()
+
+
+@router.get("/cache/metrics")
+async def get_product_cache_metrics():
+    """Métricas de la caché de productos por nivel (local, compartida, base de datos)"""
+    return product_cache.metrics()
+
+
+@router.post("/categories/backfill")
+async def backfill_product_categories(recompute_all: bool = Query(False, description="Recalcular todos los productos")):
+    """Calcular la categoría normalizada de los productos guardados antes de la taxonomía"""
+    try:
+        return await backfill_category_keys(recompute_all)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al normalizar categorías: {str(e)}")
+
+
+@router.get("/saved", response_model=Union[List[ProductResponse], List[ProductSummary]])
 async def get_saved_products(
+        request: Request,
+        response: Response,
         limit: int = Query(20, ge=1, le=100),
         skip: int = Query(0, ge=0),
-        category: Optional[str] = Query(None, description="Filtrar por categoría")
+        category: Optional[str] = Query(None, description="Filtrar por categoría (nombre, alias o clave de la taxonomía)"),
+        category_match: str = Query("prefix", pattern="^(exact|prefix)$",
+                                    description="exact: solo la categoría; prefix: incluye subcategorías"),
+        cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (cabecera X-Next-Cursor)"),
+        view: str = Query("full", pattern="^(full|summary)$",
+                          description="full: producto completo; summary: campos del listado")
 ):
-    """Obtener productos guardados en MongoDB"""
+    """
+    Obtener productos guardados en MongoDB.
+
+    Para paginar sin skip usar `cursor` con el valor de la cabecera X-Next-Cursor
+    de la respuesta anterior. Con `view=summary` MongoDB devuelve solo los campos
+    de ProductSummary. La respuesta lleva ETag y Last-Modified: si la página no
+    cambió se responde 304 leyendo solo el _id y las fechas de sus productos.
+    """
     try:
         # Construir filtro
         filter_query = {}
         if category:
-            filter_query["category"] = {"$regex": category, "$options": "i"}
-
-        # Ejecutar consulta
-        cursor = products_collection.find(filter_query).sort("updated_at", -1).skip(skip).limit(limit)
-        products = await cursor.to_list(length=limit)
-
-        return [ProductResponse(**product_helper(product)) for product in products]
+            filter_query.update(category_taxonomy.filter(category, category_match))
+
+        # Ejecutar consulta (keyset si hay cursor; skip se mantiene por compatibilidad)
+        projection, helper = PRODUCT_VIEWS[view]
+        query = keyset_query(filter_query, "updated_at", cursor)
+
+        if has_validators(request):
+            # Revalidación: leer solo _id y fechas de la página antes que los documentos completos
+            db_cursor = products_collection.find(query, validator_projection("updated_at"))
+            db_cursor = db_cursor.sort(keyset_sort("updated_at")).skip(skip).limit(limit)
+            keys = await db_cursor.to_list(length=limit)
+
+            unchanged = not_modified(request, documents_etag(keys, view), last_modified(keys))
+            if unchanged is not None:
+                following = next_cursor(keys, "updated_at", limit)
+                if following:
+                    unchanged.headers[NEXT_CURSOR_HEADER] = following
+                return unchanged
+
+        db_cursor = products_collection.find(query, projection)
+        db_cursor = db_cursor.sort(keyset_sort("updated_at")).skip(skip).limit(limit)
+        products = await db_cursor.to_list(length=limit)
+
+        following = next_cursor(products, "updated_at", limit)
+        if following:
+            response.headers[NEXT_CURSOR_HEADER] = following
+
+        return cached_response(
+            request, documents_etag(products, view), last_modified(products),
+            lambda: [helper(product) for product in products], response
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener productos guardados: {str(e)}")
 
 
 @router.get("/{asin}", response_model=ProductResponse)
-async def get_product_by_asin(asin: str):
-    """Obtener producto por ASIN (primero desde DB, luego desde Amazon)"""
+async def get_product_by_asin(asin: str, request: Request):
+    """
+    Obtener producto por ASIN (primero desde DB, luego desde Amazon).
+
+    La respuesta lleva ETag (y Last-Modified si el producto está guardado); con
+    If-None-Match vigente se responde 304 sin armar el cuerpo.
+    """
     try:
-        # Buscar primero en la base de datos
-        product_doc = await products_collection.find_one({"asin": asin})
+        # Buscar primero en la base de datos (a través de la caché de productos)
+        product_doc = await product_cache.get(asin)
 
         if product_doc:
-            return ProductResponse(**product_helper(product_doc))
-
-        # Si no está en DB, buscar en Amazon mock
-        product = await AmazonService.get_product_by_asin(asin)
-
-        senae_category = SenaeCalculator.determine_category(
-            product.price,
-            product.weight or 1.0,
-            product.category or ""
-        )
-
-        tariff_calculation = SenaeCalculator.calculate_tariff(
-            senae_category,
-            product.price,
-            product.weight or 1.0,
-            product_type=product.category or "general"
-        )
-
-        # Guardar en MongoDB
-        await save_product_to_db(product, senae_category.value, tariff_calculation)
-
-        response_product = ProductResponse(
-            id=product.asin,
-            asin=product.asin,
-            title=product.title,
-            price=product.price,
-            weight=product.weight,
-            dimensions=product.dimensions,
-            image_url=product.image_url,
-            category=product.category,
-            description=product.description,
-            availability=product.availability,
-            senae_category=senae_category.value,
-            calculated_tariff=tariff_calculation
-        )
+            return cached_response(
+                request, documents_etag([product_doc]), modified_at(product_doc),
+                lambda: product_helper(product_doc)
+            )
 
-        return response_product
+        # Si no está en DB, las peticiones concurrentes por el mismo ASIN comparten
+        # una sola consulta al proveedor, cálculo y guardado
+        product = await product_lookups.do(asin, lambda: fetch_and_save_product(asin))
+        return hashed_response(request, product.model_dump())
 
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Producto no encontrado: {str(e)}")
 
 
+async def fetch_and_save_product(asin: str) -> ProductResponse:
+    """Obtener un producto del proveedor, calcular su tarifa y guardarlo"""
+    product = await AmazonService.get_product_by_asin(asin)
+
+    senae_category = SenaeCalculator.determine_category(
+        product.price,
+        product.weight or 1.0,
+        product.category or ""
+    )
+
+    tariff_calculation = tariff_cache.calculate_tariff(
+        senae_category,
+        product.price,
+        product.weight or 1.0,
+        product_type=product.category or "general"
+    )
+
+    # Guardar en MongoDB
+    await save_product_to_db(product, senae_category.value, tariff_calculation)
+
+    response_product = ProductResponse(
+        id=product.asin,
+        asin=product.asin,
+        title=product.title,
+        price=product.price,
+        weight=product.weight,
+        dimensions=product.dimensions,
+        image_url=product.image_url,
+        category=product.category,
+        description=product.description,
+        availability=product.availability,
+        senae_category=senae_category.value,
+        calculated_tariff=tariff_calculation
+    )
+
+    return response_product
+
+
 @router.post("/calculate-tariff")
 async def calculate_custom_tariff(
         asin: str,
         senae_category: str,
         custom_weight: Optional[float] = None,
-        product_type: Optional[str] = None
+        product_type: Optional[str] = None,
+        hs_code: Optional[str] = None
 ):
     """Calcular tarifa personalizada para un producto"""
     try:
         # Buscar producto en DB primero
-        product_doc = await products_collection.find_one({"asin": asin})
+        product_doc = await product_cache.get(asin)
 
         if product_doc:
             product_price = product_doc["price"]
@@ -265,11 +384,12 @@ async def calculate_custom_tariff(
         # Convertir categoría string a enum
         category_enum = SenaeCategory(senae_category.upper())
 
-        tariff_calculation = SenaeCalculator.calculate_tariff(
+        tariff_calculation = tariff_cache.calculate_tariff(
             category_enum,
             product_price,
             product_weight,
-            product_type=product_category
+            product_type=product_category,
+            hs_code=hs_code
         )
 
         return {
@@ -291,7 +411,7 @@ async def bulk_save_products():
         # Obtener productos trending para guardar inicialmente
         products = await AmazonService.get_trending_products(20)
 
-        saved_count = 0
+        to_save = []
         for product in products:
             senae_category = SenaeCalculator.determine_category(
                 product.price,
@@ -299,20 +419,21 @@ async def bulk_save_products():
                 product.category or ""
             )
 
-            tariff_calculation = SenaeCalculator.calculate_tariff(
+            tariff_calculation = tariff_cache.calculate_tariff(
                 senae_category,
                 product.price,
                 product.weight or 1.0,
                 product_type=product.category or "general"
             )
 
-            success = await save_product_to_db(product, senae_category.value, tariff_calculation)
-            if success:
-                saved_count += 1
+            to_save.append((product, senae_category.value, tariff_calculation))
+
+        result = await save_products_to_db(to_save)
 
         return {
-            "message": f"Se guardaron {saved_count} productos en la base de datos",
-            "total_processed": len(products)
+            "message": f"Se guardaron {result['saved']} productos en la base de datos",
+            "total_processed": len(products),
+            "failed": result["failed"]
         }
 
     except Exception as e:
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException
+from app.services.rate_tables import get_rate_table, rate_tables
+from app.services.tariff_materializer import tariff_materializer
+
+router = APIRouter()
+
+
+@router.get("/rates")
+async def get_rates():
+    """Obtener la tabla de tarifas SENAE vigente"""
+    return get_rate_table().config
+
+
+@router.post("/rates/reload")
+async def reload_rates():
+    """Recargar la tabla de tarifas desde el archivo versionado (sin reiniciar el servidor)"""
+    previous_version = get_rate_table().version
+    try:
+        table = rate_tables.reload()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error al cargar la tabla de tarifas: {str(e)}")
+
+    return {
+        "message": "Tabla de tarifas actualizada",
+        "previous_version": previous_version,
+        "version": table.version
+    }
+
+
+@router.get("/materialized/status")
+async def get_materialized_status():
+    """Estado de las tarifas materializadas en los productos guardados"""
+    try:
+        return await tariff_materializer.status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener estado de tarifas: {str(e)}")
+
+
+@router.post("/materialized/refresh")
+async def refresh_materialized_tariffs():
+    """Recalcular las tarifas guardadas que usan otra versión de la tabla de tarifas"""
+    try:
+        return await tariff_materializer.refresh()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al recalcular tarifas: {str(e)}")
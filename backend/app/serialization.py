@@ -0,0 +1,24 @@
+"""
+Serialización rápida de respuestas.
+
+Los documentos leídos de MongoDB (o armados por la propia API) ya tienen la forma
+de la respuesta después de pasar por los helpers (order_helper, product_helper):
+se serializan directamente con orjson sin construir modelos de pydantic ni volver
+a validarlos con `response_model` (que se mantiene en las rutas para la documentación).
+"""
+from typing import Any, Optional
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+
+def trusted_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> ORJSONResponse:
+    """
+    Respuesta JSON para contenido de confianza (sin validación).
+    Si la ruta recibió `response`, se copian sus cabeceras (p. ej. X-Next-Cursor).
+    """
+    fast_response = ORJSONResponse(content=content, status_code=status_code)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                fast_response.headers[name] = value
+    return fast_response
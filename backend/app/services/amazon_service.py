@@ -1,11 +1,56 @@
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 #from backend.app.models.product import Product
 from app.models.product import Product
+from app.services.product_catalog import ProductCatalog, CATALOG_FILE
+from app.services.catalog_provider import CatalogProvider, LocalCatalogProvider, http_provider_from_env
+from app.instrumentation import timed
 
 
 class AmazonService:
-    """Servicio mock para simular la API de Amazon"""
+    """
+    Servicio de catálogo de productos (Amazon).
+
+    Delega en un CatalogProvider: por defecto el catálogo local en memoria (mock),
+    o un proveedor HTTP real si se define CATALOG_PROVIDER_URL.
+    """
+
+    _catalog: Optional[ProductCatalog] = None
+    _provider: Optional[CatalogProvider] = None
+
+    @staticmethod
+    def get_catalog() -> ProductCatalog:
+        """Catálogo indexado, construido una sola vez (desde CATALOG_FILE o los productos mock)"""
+        if AmazonService._catalog is None:
+            if CATALOG_FILE:
+                AmazonService._catalog = ProductCatalog.from_file(CATALOG_FILE)
+            else:
+                AmazonService._catalog = ProductCatalog(AmazonService._generate_mock_products())
+        return AmazonService._catalog
+
+    @staticmethod
+    def set_catalog(catalog: ProductCatalog) -> None:
+        """Reemplazar el catálogo en memoria (p. ej. tras recargar el archivo)"""
+        AmazonService._catalog = catalog
+        if isinstance(AmazonService._provider, LocalCatalogProvider):
+            AmazonService._provider = LocalCatalogProvider(catalog)
+
+    @staticmethod
+    def get_provider() -> CatalogProvider:
+        """Proveedor de catálogo configurado (HTTP si hay CATALOG_PROVIDER_URL, si no el local)"""
+        if AmazonService._provider is None:
+            AmazonService._provider = http_provider_from_env() or LocalCatalogProvider(AmazonService.get_catalog())
+        return AmazonService._provider
+
+    @staticmethod
+    def set_provider(provider: CatalogProvider) -> None:
+        AmazonService._provider = provider
+
+    @staticmethod
+    async def close() -> None:
+        """Cerrar las conexiones del proveedor"""
+        if AmazonService._provider is not None:
+            await AmazonService._provider.close()
 
     @staticmethod
     def _generate_mock_products() -> List[Dict[str, Any]]:
@@ -125,30 +170,10 @@ class AmazonService:
         return products
 
     @staticmethod
+    @timed("amazon.search_products")
     async def search_products(query: str, category: str = None, limit: int = 10) -> List[Product]:
-        """Buscar productos en Amazon (simulado)"""
-        mock_products = AmazonService._generate_mock_products()
-
-        # Filtrar por query
-        if query:
-            filtered_products = [
-                p for p in mock_products
-                if query.lower() in p["title"].lower() or
-                   query.lower() in p["category"].lower() or
-                   query.lower() in p["description"].lower()
-            ]
-        else:
-            filtered_products = mock_products
-
-        # Filtrar por categoría
-        if category:
-            filtered_products = [
-                p for p in filtered_products
-                if category.lower() in p["category"].lower()
-            ]
-
-        # Limitar resultados
-        filtered_products = filtered_products[:limit]
+        """Buscar productos en el proveedor de catálogo"""
+        filtered_products = await AmazonService.get_provider().search_products(query, category, limit)
 
         # Convertir a objetos Product
         products = []
@@ -159,34 +184,19 @@ class AmazonService:
         return products
 
     @staticmethod
+    @timed("amazon.get_product_by_asin")
     async def get_product_by_asin(asin: str) -> Product:
-        """Obtener producto por ASIN (simulado)"""
-        mock_products = AmazonService._generate_mock_products()
-
-        for product_data in mock_products:
-            if product_data["asin"] == asin:
-                return Product(**product_data)
-
-        # Si no se encuentra, generar uno aleatorio
-        return Product(
-            asin=asin,
-            title=f"Producto Mock {asin}",
-            price=round(random.uniform(10, 500), 2),
-            weight=round(random.uniform(0.1, 10), 2),
-            dimensions={"length": 10, "width": 10, "height": 10},
-            image_url="https://via.placeholder.com/300x300",
-            category="Mock Category",
-            description="Producto generado para pruebas",
-            availability=True
-        )
+        """Obtener producto por ASIN"""
+        product_data = await AmazonService.get_provider().get_product(asin)
+        if product_data is None:
+            raise ValueError(f"Producto {asin} no existe en el catálogo")
+        return Product(**product_data)
 
     @staticmethod
+    @timed("amazon.get_trending_products")
     async def get_trending_products(limit: int = 5) -> List[Product]:
-        """Obtener productos en tendencia (simulado)"""
-        mock_products = AmazonService._generate_mock_products()
-
-        # Seleccionar productos aleatorios
-        selected_products = random.sample(mock_products, min(limit, len(mock_products)))
+        """Obtener productos en tendencia"""
+        selected_products = await AmazonService.get_provider().get_trending_products(limit)
 
         products = []
         for product_data in selected_products:
@@ -0,0 +1,276 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import random
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+import httpx
+from dotenv import load_dotenv
+from app.services.product_catalog import ProductCatalog
+
+load_dotenv()
+
+# Proveedor HTTP de catálogo (si no se define se usa el catálogo local)
+CATALOG_PROVIDER_URL = os.getenv("CATALOG_PROVIDER_URL")
+CATALOG_PROVIDER_API_KEY = os.getenv("CATALOG_PROVIDER_API_KEY")
+CATALOG_PROVIDER_HTTP2 = os.getenv("CATALOG_PROVIDER_HTTP2", "false").lower() in ("1", "true", "yes")
+CATALOG_PROVIDER_TIMEOUT = float(os.getenv("CATALOG_PROVIDER_TIMEOUT", "5"))
+CATALOG_PROVIDER_MAX_CONNECTIONS = int(os.getenv("CATALOG_PROVIDER_MAX_CONNECTIONS", "100"))
+CATALOG_PROVIDER_MAX_PER_HOST = int(os.getenv("CATALOG_PROVIDER_MAX_PER_HOST", "20"))
+CATALOG_PROVIDER_RETRIES = int(os.getenv("CATALOG_PROVIDER_RETRIES", "3"))
+
+# Respuestas HTTP que vale la pena reintentar
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class CatalogProviderError(Exception):
+    """Error al consultar el proveedor de catálogo"""
+
+
+class CircuitOpenError(CatalogProviderError):
+    """El circuito está abierto: el proveedor falló repetidamente y no se consulta"""
+
+
+class CatalogProvider(ABC):
+    """Interfaz de un proveedor de catálogo de productos (datos crudos en diccionarios)"""
+
+    @abstractmethod
+    async def search_products(self, query: str, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def get_product(self, asin: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def get_trending_products(self, limit: int) -> List[Dict[str, Any]]:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalCatalogProvider(CatalogProvider):
+    """Proveedor en memoria sobre ProductCatalog (mock); genera productos para ASINs desconocidos"""
+
+    def __init__(self, catalog: ProductCatalog):
+        self.catalog = catalog
+
+    async def search_products(self, query: str, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        return self.catalog.search(query, category, limit)
+
+    async def get_product(self, asin: str) -> Optional[Dict[str, Any]]:
+        product = self.catalog.get(asin)
+        if product is not None:
+            return product
+
+        # Si no se encuentra, generar uno aleatorio
+        return {
+            "asin": asin,
+            "title": f"Producto Mock {asin}",
+            "price": round(random.uniform(10, 500), 2),
+            "weight": round(random.uniform(0.1, 10), 2),
+            "dimensions": {"length": 10, "width": 10, "height": 10},
+            "image_url": "https://via.placeholder.com/300x300",
+            "category": "Mock Category",
+            "description": "Producto generado para pruebas",
+            "availability": True
+        }
+
+    async def get_trending_products(self, limit: int) -> List[Dict[str, Any]]:
+        return self.catalog.sample(limit)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simple: tras `failure_threshold` fallos seguidos se abre por
+    `reset_timeout` segundos; luego deja pasar una petición de prueba (semi-abierto)
+    y se cierra si esta tiene éxito.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_request(self) -> bool:
+        """
+        Autorizar una petición; devuelve True si es la petición de prueba del estado
+        semi-abierto, que debe llamar a release() al terminar.
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            raise CircuitOpenError("Proveedor de catálogo no disponible (circuito abierto)")
+        if state == "half_open":
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """Liberar la petición de prueba (solo quien la obtuvo en before_request)"""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class HttpCatalogProvider(CatalogProvider):
+    """
+    Proveedor de catálogo sobre HTTP con un único httpx.AsyncClient compartido.
+
+    - Pool de conexiones keep-alive (HTTP/2 opcional si está instalado `h2`)
+    - Límite de peticiones concurrentes por host
+    - Timeouts y reintentos con backoff exponencial y jitter
+    - Circuit breaker para no insistir contra un proveedor caído
+
+    Contrato esperado del proveedor (ver catalog_stub_server):
+    GET /products/search?q=&category=&limit=, GET /products/trending?limit=, GET /products/{asin}
+    """
+
+    def __init__(
+            self,
+            base_url: str,
+            api_key: Optional[str] = None,
+            timeout: float = 5.0,
+            max_connections: int = 100,
+            max_per_host: int = 20,
+            retries: int = 3,
+            backoff_base: float = 0.1,
+            backoff_max: float = 2.0,
+            http2: bool = False,
+            circuit_breaker: Optional[CircuitBreaker] = None,
+            transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_per_host = max_per_host
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._client_options = {
+            "base_url": self.base_url,
+            "headers": {"Authorization": f"Bearer {api_key}"} if api_key else {},
+            "timeout": httpx.Timeout(timeout),
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=30.0
+            ),
+            "http2": http2 and _h2_available(),
+            "transport": transport
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente compartido, creado en el primer uso"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(**self._client_options)
+        return self._client
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return semaphore
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial con jitter completo"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """GET con reintentos; devuelve None si el recurso no existe (404)"""
+        trial = self.circuit_breaker.before_request()
+        try:
+            return await self._get_with_retries(path, params)
+        finally:
+            if trial:
+                self.circuit_breaker.release()
+
+    async def _get_with_retries(self, path: str, params: Optional[Dict[str, Any]]) -> Optional[Any]:
+        semaphore = self._semaphore(self.base_url)
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    response = await self.client.get(path, params=params)
+                if response.status_code == 404:
+                    self.circuit_breaker.record_success()
+                    return None
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    self.circuit_breaker.record_success()
+                    return response.json()
+                last_error = CatalogProviderError(f"El proveedor respondió {response.status_code}")
+            except httpx.HTTPStatusError as e:
+                # Errores 4xx no se reintentan
+                self.circuit_breaker.record_success()
+                raise CatalogProviderError(f"El proveedor respondió {e.response.status_code}") from e
+            except (httpx.TransportError, ValueError) as e:
+                last_error = e
+
+            if attempt < self.retries:
+                await asyncio.sleep(self._backoff(attempt))
+
+        self.circuit_breaker.record_failure()
+        raise CatalogProviderError(f"Error al consultar el proveedor de catálogo: {last_error}")
+
+    async def search_products(self, query: str, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        params = {"q": query, "limit": limit}
+        if category:
+            params["category"] = category
+        return await self._get("/products/search", params) or []
+
+    async def get_product(self, asin: str) -> Optional[Dict[str, Any]]:
+        return await self._get(f"/products/{asin}")
+
+    async def get_trending_products(self, limit: int) -> List[Dict[str, Any]]:
+        return await self._get("/products/trending", {"limit": limit}) or []
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def http_provider_from_env() -> Optional[HttpCatalogProvider]:
+    """Proveedor HTTP configurado por variables de entorno (None si no hay URL)"""
+    if not CATALOG_PROVIDER_URL:
+        return None
+    return HttpCatalogProvider(
+        CATALOG_PROVIDER_URL,
+        api_key=CATALOG_PROVIDER_API_KEY,
+        timeout=CATALOG_PROVIDER_TIMEOUT,
+        max_connections=CATALOG_PROVIDER_MAX_CONNECTIONS,
+        max_per_host=CATALOG_PROVIDER_MAX_PER_HOST,
+        retries=CATALOG_PROVIDER_RETRIES,
+        http2=CATALOG_PROVIDER_HTTP2
+    )
@@ -0,0 +1,57 @@
+"""
+Servidor stub local de un proveedor de catálogo, para desarrollar y probar a mano
+HttpCatalogProvider sin depender de la API real. Sirve el mismo catálogo local que
+usa la app sin proveedor (CATALOG_FILE o los productos mock).
+
+    uvicorn app.services.catalog_stub_server:app --port 8001
+    CATALOG_PROVIDER_URL=http://localhost:8001 uvicorn app.main:app
+
+Variables para simular fallas: STUB_FAILURE_RATE (0-1, responde 503) y
+STUB_LATENCY_MS (latencia agregada a cada respuesta).
+"""
+import asyncio
+import os
+import random
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query
+from app.services.amazon_service import AmazonService
+
+app = FastAPI(title="iBizTrack - Stub de proveedor de catálogo")
+
+catalog = AmazonService.get_catalog()
+settings = {
+    "failure_rate": float(os.getenv("STUB_FAILURE_RATE", "0")),
+    "latency_ms": float(os.getenv("STUB_LATENCY_MS", "0"))
+}
+
+
+async def _simulate_conditions():
+    if settings["latency_ms"]:
+        await asyncio.sleep(settings["latency_ms"] / 1000)
+    if settings["failure_rate"] and random.random() < settings["failure_rate"]:
+        raise HTTPException(status_code=503, detail="Falla simulada")
+
+
+@app.get("/products/search")
+async def search_products(
+        q: str = "",
+        category: Optional[str] = None,
+        limit: int = Query(10, ge=1, le=100)
+):
+    await _simulate_conditions()
+    return catalog.search(q, category, limit)
+
+
+@app.get("/products/trending")
+async def get_trending_products(limit: int = Query(5, ge=1, le=100)):
+    await _simulate_conditions()
+    return catalog.sample(limit)
+
+
+@app.get("/products/{asin}")
+async def get_product(asin: str):
+    await _simulate_conditions()
+    product = catalog.get(asin)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    return product
@@ -0,0 +1,136 @@
+"""
+Taxonomía de categorías de productos.
+
+Cada producto guarda `category_key`, la clave canónica de su categoría
+(p. ej. "Shoes" y "Calzado" -> "fashion/footwear"), calculada al escribir.
+Los filtros por categoría comparan contra ese campo indexado en lugar de usar
+una expresión regular sin anclar sobre `category`:
+
+    exact:  {"category_key": "fashion/footwear"}
+    prefix: {"category_key": {"$regex": "^fashion(/|$)"}}   # acotado por el índice
+
+Las categorías que no están en la taxonomía se guardan con su forma normalizada
+("Pet Supplies" -> "pet-supplies"). Uso por línea de comandos (desde backend/):
+
+    python -m app.services.category_taxonomy backfill        # solo documentos sin category_key
+    python -m app.services.category_taxonomy backfill --all  # recalcular todos (tras editar la taxonomía)
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from app.models.category_taxonomy import CategoryTaxonomyConfig
+from app.services.search_index import fold_accents
+
+load_dotenv()
+
+# Archivo versionado con la taxonomía de categorías
+CATEGORY_TAXONOMY_FILE = os.getenv(
+    "CATEGORY_TAXONOMY_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "category_taxonomy.json")
+)
+
+# Productos actualizados por cada bulk_write del backfill
+BACKFILL_BATCH_SIZE = int(os.getenv("CATEGORY_BACKFILL_BATCH_SIZE", "1000"))
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def slugify(text: str) -> str:
+    """Forma normalizada de un nombre: sin tildes, minúsculas y '-' como separador"""
+    return _NON_ALNUM.sub("-", fold_accents(text).lower()).strip("-")
+
+
+class CategoryTaxonomy:
+    """Taxonomía compilada: alias normalizado -> clave canónica"""
+
+    def __init__(self, config: CategoryTaxonomyConfig):
+        self.config = config
+        self.version = config.version
+        self.names: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+
+        for category in config.categories:
+            self.names[category.key] = category.name
+            for alias in [category.key, category.key.rsplit("/", 1)[-1], category.name, *category.aliases]:
+                self._aliases.setdefault(slugify(alias), category.key)
+
+    def normalize(self, category: Optional[str]) -> Optional[str]:
+        """Clave canónica de una categoría tal como llega del proveedor o del usuario"""
+        if not category:
+            return None
+        if category in self.names:
+            return category
+        slug = slugify(category)
+        if not slug:
+            return None
+        return self._aliases.get(slug, slug)
+
+    def filter(self, category: str, match: str = "prefix") -> Dict[str, Any]:
+        """
+        Filtro de MongoDB sobre category_key.
+        'exact' compara la clave completa; 'prefix' incluye además sus subcategorías.
+        Una categoría sin clave (p. ej. solo signos) no coincide con ningún producto.
+        """
+        key = self.normalize(category)
+        if key is None:
+            return {"category_key": {"$in": []}}
+        if match == "exact":
+            return {"category_key": key}
+        return {"category_key": {"$regex": f"^{re.escape(key)}(/|$)"}}
+
+    @classmethod
+    def from_file(cls, path: str) -> "CategoryTaxonomy":
+        with open(path, encoding="utf-8") as f:
+            return cls(CategoryTaxonomyConfig(**json.load(f)))
+
+
+category_taxonomy = CategoryTaxonomy.from_file(CATEGORY_TAXONOMY_FILE)
+
+
+async def backfill_category_keys(recompute_all: bool = False,
+                                 batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Calcular category_key en los productos guardados, por lotes de bulk_write.
+    Por defecto solo los que no lo tienen; recompute_all=True recalcula todos.
+    """
+    from app.database import products_collection
+    from app.services.product_cache import product_cache
+
+    query = {} if recompute_all else {"category_key": {"$exists": False}}
+    scanned = updated = 0
+    operations: List[UpdateOne] = []
+    asins: List[str] = []
+
+    async def flush() -> int:
+        if not operations:
+            return 0
+        result = await products_collection.bulk_write(operations, ordered=False)
+        await product_cache.invalidate(asins)
+        operations.clear()
+        asins.clear()
+        return result.modified_count
+
+    async for doc in products_collection.find(query, {"asin": 1, "category": 1, "category_key": 1}):
+        scanned += 1
+        key = category_taxonomy.normalize(doc.get("category"))
+        if "category_key" in doc and doc["category_key"] == key:
+            continue
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"category_key": key}}))
+        asins.append(doc.get("asin"))
+        if len(operations) >= batch_size:
+            updated += await flush()
+
+    updated += await flush()
+    return {"scanned": scanned, "updated": updated}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print("Uso: python -m app.services.category_taxonomy backfill [--all]")
+        sys.exit(2)
+    print(asyncio.run(backfill_category_keys(recompute_all="--all" in sys.argv[2:])))
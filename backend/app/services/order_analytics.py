@@ -0,0 +1,274 @@
+"""
+Analítica de órdenes con resúmenes diarios materializados.
+
+Cada día (por fecha de creación de la orden, UTC) tiene un documento en
+`order_daily_rollups` que se actualiza con $inc al crear, cambiar de estado o
+eliminar una orden. Las consultas del dashboard leen solo esos documentos, así
+que su costo depende del número de días consultados y no del número de órdenes.
+
+    {
+        "_id": "2024-05-01",
+        "date": datetime(2024, 5, 1),
+        "orders_count": 3, "total_value": 250.0, "total_weight": 4.2, "total_taxes": 31.5,
+        "by_status": {"draft": {"count": 2, "total_value": 150.0, "total_taxes": 20.0}, ...},
+        "by_category": {"B": {"items_count": 3, "quantity": 4, "total_value": 180.0, "total_taxes": 22.0}, ...},
+        "updated_at": datetime(...)
+    }
+"""
+from datetime import datetime, time
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from app.database import orders_collection, order_rollups_collection
+from app.indexes import INDEXES
+
+ROUND_DIGITS = 2
+
+
+def _day_key(created_at: datetime) -> str:
+    return created_at.strftime("%Y-%m-%d")
+
+
+def _order_taxes(order: Dict[str, Any]) -> float:
+    return (order.get("total_tariffs") or {}).get("total_taxes", 0)
+
+
+def _status_increments(order: Dict[str, Any], status: str, sign: int) -> Dict[str, Any]:
+    return {
+        f"by_status.{status}.count": sign,
+        f"by_status.{status}.total_value": sign * order.get("total_value", 0),
+        f"by_status.{status}.total_taxes": sign * _order_taxes(order),
+    }
+
+
+def order_increments(order: Dict[str, Any], sign: int = 1) -> Dict[str, Any]:
+    """Incrementos ($inc) que una orden aporta a su resumen diario (sign=-1 para restarla)"""
+    increments = {
+        "orders_count": sign,
+        "total_value": sign * order.get("total_value", 0),
+        "total_weight": sign * order.get("total_weight", 0),
+        "total_taxes": sign * _order_taxes(order),
+    }
+    increments.update(_status_increments(order, order["status"], sign))
+
+    for item in order.get("items", []):
+        category = item.get("senae_category")
+        category = getattr(category, "value", category)
+        tariff_calculation = item.get("tariff_calculation") or {}
+        prefix = f"by_category.{category}"
+        increments[f"{prefix}.items_count"] = increments.get(f"{prefix}.items_count", 0) + sign
+        increments[f"{prefix}.quantity"] = increments.get(f"{prefix}.quantity", 0) + sign * item.get("quantity", 0)
+        increments[f"{prefix}.total_value"] = (
+            increments.get(f"{prefix}.total_value", 0)
+            + sign * item.get("unit_price", 0) * item.get("quantity", 0)
+        )
+        increments[f"{prefix}.total_taxes"] = (
+            increments.get(f"{prefix}.total_taxes", 0) + sign * tariff_calculation.get("total_taxes", 0)
+        )
+    return increments
+
+
+async def _apply(created_at: datetime, increments: Dict[str, Any]) -> None:
+    day = _day_key(created_at)
+    await order_rollups_collection.update_one(
+        {"_id": day},
+        {
+            "$inc": increments,
+            "$set": {"updated_at": datetime.utcnow()},
+            "$setOnInsert": {"date": datetime.combine(created_at.date(), time.min)}
+        },
+        upsert=True
+    )
+
+
+async def record_order_created(order: Dict[str, Any]) -> None:
+    await _apply(order["created_at"], order_increments(order))
+
+
+async def record_orders_created(orders: List[Dict[str, Any]]) -> None:
+    """Registrar varias órdenes con una sola actualización por día"""
+    by_day: Dict[str, Dict[str, Any]] = {}
+    for order in orders:
+        day = _day_key(order["created_at"])
+        entry = by_day.setdefault(day, {"created_at": order["created_at"], "increments": {}})
+        for key, value in order_increments(order).items():
+            entry["increments"][key] = entry["increments"].get(key, 0) + value
+
+    for entry in by_day.values():
+        await _apply(entry["created_at"], entry["increments"])
+
+
+async def record_status_change(order: Dict[str, Any], previous_status: str, status: str) -> None:
+    if previous_status == status:
+        return
+    increments = _status_increments(order, previous_status, -1)
+    for key, value in _status_increments(order, status, 1).items():
+        increments[key] = increments.get(key, 0) + value
+    await _apply(order["created_at"], increments)
+
+
+async def record_order_deleted(order: Dict[str, Any]) -> None:
+    await _apply(order["created_at"], order_increments(order, sign=-1))
+
+
+def _date_match(date_from: Optional[datetime], date_to: Optional[datetime], field: str) -> Dict[str, Any]:
+    match: Dict[str, Any] = {}
+    if date_from:
+        match.setdefault(field, {})["$gte"] = datetime.combine(date_from.date(), time.min)
+    if date_to:
+        match.setdefault(field, {})["$lte"] = datetime.combine(date_to.date(), time.max)
+    return match
+
+
+def _round(value: float) -> float:
+    return round(value or 0, ROUND_DIGITS)
+
+
+async def get_summary(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> Dict[str, Any]:
+    """Totales generales del período"""
+    pipeline = [
+        {"$match": _date_match(date_from, date_to, "date")},
+        {"$group": {
+            "_id": None,
+            "orders_count": {"$sum": "$orders_count"},
+            "total_value": {"$sum": "$total_value"},
+            "total_weight": {"$sum": "$total_weight"},
+            "total_taxes": {"$sum": "$total_taxes"},
+        }},
+    ]
+    rows = await order_rollups_collection.aggregate(pipeline).to_list(length=1)
+    totals = rows[0] if rows else {}
+    orders_count = totals.get("orders_count", 0)
+    return {
+        "orders_count": orders_count,
+        "total_value": _round(totals.get("total_value")),
+        "total_weight": _round(totals.get("total_weight")),
+        "total_taxes": _round(totals.get("total_taxes")),
+        "average_taxes": _round(totals.get("total_taxes", 0) / orders_count) if orders_count else 0,
+    }
+
+
+async def _totals_by(field: str, date_from: Optional[datetime], date_to: Optional[datetime],
+                     sums: List[str]) -> List[Dict[str, Any]]:
+    pipeline = [
+        {"$match": _date_match(date_from, date_to, "date")},
+        {"$project": {"entries": {"$objectToArray": f"${field}"}}},
+        {"$unwind": "$entries"},
+        {"$group": {"_id": "$entries.k", **{name: {"$sum": f"$entries.v.{name}"} for name in sums}}},
+        {"$sort": {"_id": 1}},
+    ]
+    rows = await order_rollups_collection.aggregate(pipeline).to_list(length=None)
+    return [
+        {"key": row["_id"], **{name: _round(row[name]) if name.startswith("total_") else row[name] for name in sums}}
+        for row in rows
+    ]
+
+
+async def get_totals_by_status(date_from: Optional[datetime] = None,
+                               date_to: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    rows = await _totals_by("by_status", date_from, date_to, ["count", "total_value", "total_taxes"])
+    return [{"status": row.pop("key"), **row} for row in rows if row["count"]]
+
+
+async def get_totals_by_category(date_from: Optional[datetime] = None,
+                                 date_to: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    rows = await _totals_by("by_category", date_from, date_to,
+                            ["items_count", "quantity", "total_value", "total_taxes"])
+    return [{"senae_category": row.pop("key"), **row} for row in rows if row["items_count"]]
+
+
+async def get_daily_totals(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                           limit: int = 31) -> List[Dict[str, Any]]:
+    """Totales por día (los más recientes primero)"""
+    cursor = order_rollups_collection.find(
+        _date_match(date_from, date_to, "date"),
+        {"orders_count": 1, "total_value": 1, "total_weight": 1, "total_taxes": 1}
+    ).sort("_id", -1).limit(limit)
+    return [
+        {
+            "day": row["_id"],
+            "orders_count": row.get("orders_count", 0),
+            "total_value": _round(row.get("total_value")),
+            "total_weight": _round(row.get("total_weight")),
+            "total_taxes": _round(row.get("total_taxes")),
+        }
+        for row in await cursor.to_list(length=limit)
+    ]
+
+
+async def rebuild_rollups() -> Dict[str, Any]:
+    """
+    Reconstruir todos los resúmenes diarios desde la colección de órdenes.
+    Se usa la primera vez (órdenes anteriores a los resúmenes) o para corregir desvíos.
+
+    Los incrementos escritos entre la lectura de las órdenes y el reemplazo de la
+    colección se pierden: ejecutarlo con poca escritura o volver a ejecutarlo.
+    """
+    day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+    totals_pipeline = [
+        {"$group": {
+            "_id": day,
+            "date": {"$min": "$created_at"},
+            "orders_count": {"$sum": 1},
+            "total_value": {"$sum": "$total_value"},
+            "total_weight": {"$sum": "$total_weight"},
+            "total_taxes": {"$sum": "$total_tariffs.total_taxes"},
+        }},
+    ]
+    status_pipeline = [
+        {"$group": {
+            "_id": {"day": day, "status": "$status"},
+            "count": {"$sum": 1},
+            "total_value": {"$sum": "$total_value"},
+            "total_taxes": {"$sum": "$total_tariffs.total_taxes"},
+        }},
+    ]
+    category_pipeline = [
+        {"$unwind": "$items"},
+        {"$group": {
+            "_id": {"day": day, "category": "$items.senae_category"},
+            "items_count": {"$sum": 1},
+            "quantity": {"$sum": "$items.quantity"},
+            "total_value": {"$sum": {"$multiply": ["$items.unit_price", "$items.quantity"]}},
+            "total_taxes": {"$sum": "$items.tariff_calculation.total_taxes"},
+        }},
+    ]
+
+    rollups: Dict[str, Dict[str, Any]] = {}
+    now = datetime.utcnow()
+    async for row in orders_collection.aggregate(totals_pipeline):
+        key = row.pop("_id")
+        row["date"] = datetime.combine(row["date"].date(), time.min)
+        rollups[key] = {"_id": key, **row, "by_status": {}, "by_category": {}, "updated_at": now}
+    async for row in orders_collection.aggregate(status_pipeline):
+        key = row.pop("_id")
+        rollups[key["day"]]["by_status"][key["status"]] = row
+    async for row in orders_collection.aggregate(category_pipeline):
+        key = row.pop("_id")
+        rollups[key["day"]]["by_category"][key["category"]] = row
+
+    # Se escribe en una colección temporal con sus índices y se reemplaza la actual con
+    # un rename: el dashboard nunca ve la colección vacía ni a medio escribir
+    staging = order_rollups_collection.database[f"{order_rollups_collection.name}_rebuild_{ObjectId()}"]
+    try:
+        for spec in INDEXES:
+            if spec.collection == order_rollups_collection.name:
+                await staging.create_index(spec.keys, **spec.options())
+        if rollups:
+            await staging.insert_many(list(rollups.values()))
+        await staging.rename(order_rollups_collection.name, dropTarget=True)
+    except Exception:
+        await staging.drop()
+        raise
+    return {"days": len(rollups), "rebuilt_at": now}
+
+
+async def bootstrap_rollups() -> Optional[Dict[str, Any]]:
+    """
+    Construir los resúmenes si todavía no existen pero ya hay órdenes (bases anteriores
+    a los resúmenes diarios). Devuelve el resultado de rebuild_rollups o None.
+    """
+    if await order_rollups_collection.find_one({}, {"_id": 1}) is not None:
+        return None
+    if await orders_collection.find_one({}, {"_id": 1}) is None:
+        return None
+    return await rebuild_rollups()
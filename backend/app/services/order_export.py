@@ -0,0 +1,208 @@
+"""
+Exportación de órdenes en streaming (CSV, NDJSON o Parquet).
+
+Se lee un cursor de MongoDB con proyección y lotes grandes, y cada lote se
+serializa y se envía apenas llega: la memoria usada depende del tamaño del
+lote y no del número de órdenes. Cada fila es un item de una orden, con los
+campos de la orden y los de su tariff_calculation como columnas.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# Documentos pedidos a MongoDB por cada lote del cursor
+EXPORT_BATCH_SIZE = int(os.getenv("ORDER_EXPORT_BATCH_SIZE", "2000"))
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+ORDER_COLUMNS = [
+    ("order_number", "order_number", "string"),
+    ("created_at", "created_at", "timestamp"),
+    ("status", "status", "string"),
+    ("customer_name", "customer_name", "string"),
+    ("customer_email", "customer_email", "string"),
+    ("customer_cedula", "customer_cedula", "string"),
+    ("order_total_value", "total_value", "double"),
+    ("order_total_weight", "total_weight", "double"),
+    ("order_total_taxes", "total_tariffs.total_taxes", "double"),
+]
+
+ITEM_COLUMNS = [
+    ("product_asin", "product_asin", "string"),
+    ("product_title", "product_title", "string"),
+    ("quantity", "quantity", "int"),
+    ("unit_price", "unit_price", "double"),
+    ("weight", "weight", "double"),
+    ("senae_category", "senae_category", "string"),
+    ("hs_code", "hs_code", "string"),
+]
+
+# Campos de tariff_calculation (los que no aplican a la categoría quedan vacíos)
+TARIFF_COLUMNS = [
+    ("tariff_base_value", "base_value", "double"),
+    ("tariff_weight", "weight", "double"),
+    ("tariff_product_type", "product_type", "string"),
+    ("tariff", "tariff", "double"),
+    ("tariff_rate", "tariff_rate", "double"),
+    ("tariff_adv", "adv", "double"),
+    ("tariff_adv_rate", "adv_rate", "double"),
+    ("tariff_specific", "specific_tariff", "double"),
+    ("tariff_total_tariff", "total_tariff", "double"),
+    ("tariff_iva", "iva", "double"),
+    ("tariff_fodinfa", "fodinfa", "double"),
+    ("tariff_total_taxes", "total_taxes", "double"),
+    ("tariff_total_cost", "total_cost", "double"),
+    ("tariff_rate_table_version", "rate_table_version", "string"),
+    ("tariff_error", "error", "string"),
+]
+
+EXPORT_COLUMNS = [name for name, _, _ in ORDER_COLUMNS + ITEM_COLUMNS + TARIFF_COLUMNS]
+
+EXPORT_PROJECTION = {
+    "_id": 0,
+    **{path.split(".")[0]: 1 for _, path, _ in ORDER_COLUMNS},
+    "items": 1,
+}
+
+
+def _get(doc: Dict[str, Any], path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def order_rows(order: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Filas de exportación de una orden: una por item"""
+    base = {name: _get(order, path) for name, path, _ in ORDER_COLUMNS}
+    rows = []
+    for item in order.get("items") or [{}]:
+        row = dict(base)
+        row.update({name: item.get(path) for name, path, _ in ITEM_COLUMNS})
+        tariff_calculation = item.get("tariff_calculation") or {}
+        row.update({name: tariff_calculation.get(path) for name, path, _ in TARIFF_COLUMNS})
+        rows.append(row)
+    return rows
+
+
+async def iter_row_batches(collection, filter_query: Dict[str, Any],
+                           batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Lotes de filas en orden de creación, leídos con un solo cursor"""
+    cursor = collection.find(filter_query, EXPORT_PROJECTION, batch_size=batch_size)
+    cursor = cursor.sort([("created_at", 1), ("_id", 1)])
+
+    rows: List[Dict[str, Any]] = []
+    async for order in cursor:
+        rows.extend(order_rows(order))
+        if len(rows) >= batch_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def csv_chunks(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerows([_csv_value(row[name]) for name in EXPORT_COLUMNS] for row in rows)
+        yield buffer.getvalue()
+
+
+async def ndjson_chunks(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    async for rows in batches:
+        yield "".join(json.dumps(row, default=_csv_value, ensure_ascii=False) + "\n" for row in rows)
+
+
+class _StreamSink(io.RawIOBase):
+    """Archivo de solo escritura que acumula bytes hasta que se envían (ParquetWriter necesita tell())"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "double": pa.float64(), "int": pa.int64(), "timestamp": pa.timestamp("ms")}
+    return pa.schema([
+        (name, types[kind]) for name, _, kind in ORDER_COLUMNS + ITEM_COLUMNS + TARIFF_COLUMNS
+    ])
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def parquet_chunks(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Un row group de Parquet por lote (requiere pyarrow, dependencia opcional)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        async for rows in batches:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(export_format: str, batches: AsyncIterator[List[Dict[str, Any]]]):
+    if export_format == "parquet":
+        return parquet_chunks(batches)
+    if export_format == "ndjson":
+        return ndjson_chunks(batches)
+    return csv_chunks(batches)
+
+
+def export_filename(export_format: str, now: Optional[datetime] = None) -> str:
+    now = now or datetime.utcnow()
+    return f"ordenes-{now.strftime('%Y%m%d-%H%M%S')}.{EXPORT_FORMATS[export_format][1]}"
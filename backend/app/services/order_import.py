@@ -0,0 +1,258 @@
+"""
+Construcción e importación masiva de órdenes.
+
+build_order_docs() arma los documentos de varias órdenes con un solo cálculo
+vectorizado de tarifas para todos sus items; create_order lo usa con una sola orden.
+OrderImporter acumula órdenes ya validadas y las escribe por lotes con
+insert_many(ordered=False), registrando el resultado de cada fila de la entrada.
+"""
+import os
+import secrets
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from app.models.order import Order, OrderStatus
+from app.services.senae_calculator import SenaeCalculator
+from app.services.order_search import search_tokens
+from app.services import order_analytics
+from app.instrumentation import record_error
+
+# Órdenes escritas por cada insert_many de la importación masiva
+ORDER_IMPORT_CHUNK_SIZE = int(os.getenv("ORDER_IMPORT_CHUNK_SIZE", "1000"))
+
+# Columnas de la orden en la importación CSV (una fila por item)
+CSV_ORDER_FIELDS = ("customer_name", "customer_email", "customer_cedula", "shipping_address", "notes")
+CSV_ITEM_FIELDS = ("product_asin", "product_title", "quantity", "unit_price", "weight", "senae_category", "hs_code")
+
+
+def utcnow() -> datetime:
+    """
+    Hora actual truncada a milisegundos (la precisión de las fechas en MongoDB),
+    para que la respuesta construida en memoria sea igual al documento guardado
+    """
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+# Bytes aleatorios del número de orden (16 caracteres hexadecimales, 64 bits), para
+# que con decenas de miles de órdenes por minuto no se repitan en el mismo día
+ORDER_NUMBER_SUFFIX_BYTES = 8
+
+
+def new_order_number(now: datetime) -> str:
+    return f"IBT-{now.strftime('%Y%m%d')}-{secrets.token_hex(ORDER_NUMBER_SUFFIX_BYTES).upper()}"
+
+
+def build_order_docs(orders: List[Order]) -> List[Dict[str, Any]]:
+    """Documentos de MongoDB de varias órdenes, con las tarifas de todos los items en un solo paso"""
+    items = [item for order in orders for item in order.items]
+    item_values = [item.unit_price * item.quantity for item in items]
+    item_weights = [(item.weight or 1.0) * item.quantity for item in items]
+
+    batch = SenaeCalculator.calculate_tariff_batch(
+        [item.senae_category for item in items],
+        item_values,
+        item_weights,
+        product_types=["textiles" if item.senae_category.value == "D" else "general" for item in items],
+        hs_codes=[item.hs_code for item in items]
+    )
+    calculations = batch["calculations"]
+
+    docs = []
+    start = 0
+    for order in orders:
+        end = start + len(order.items)
+        processed_items = []
+        for item, tariff_calculation in zip(order.items, calculations[start:end]):
+            # Actualizar item con cálculo de tarifa
+            processed_item = item.dict()
+            processed_item["tariff_calculation"] = tariff_calculation
+            processed_items.append(processed_item)
+
+        created_at = utcnow()
+        order_number = new_order_number(created_at)
+        docs.append({
+            "order_number": order_number,
+            "customer_name": order.customer_name,
+            "customer_email": order.customer_email,
+            "customer_cedula": order.customer_cedula,
+            "items": processed_items,
+            "shipping_address": order.shipping_address,
+            "notes": order.notes,
+            "search_tokens": search_tokens(order_number, order.customer_name, order.customer_email),
+            "status": OrderStatus.DRAFT.value,
+            "total_value": round(sum(item_values[start:end]), 2),
+            "total_weight": round(sum(item_weights[start:end]), 2),
+            "total_tariffs": SenaeCalculator.summarize_tariffs(calculations[start:end]),
+            "created_at": created_at,
+            "updated_at": created_at
+        })
+        start = end
+
+    return docs
+
+
+def validation_error_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def parse_order(obj: Any) -> Order:
+    """Validar una orden recibida como objeto JSON (ValueError si no es válida)"""
+    if not isinstance(obj, dict):
+        raise ValueError("Cada orden debe ser un objeto JSON")
+    try:
+        return Order(**obj)
+    except ValidationError as e:
+        raise ValueError(validation_error_message(e))
+
+
+def order_from_csv_rows(rows: List[Dict[str, str]]) -> Order:
+    """Orden a partir de sus filas CSV (los datos del cliente se toman de la primera)"""
+    order = {field: rows[0].get(field) or None for field in CSV_ORDER_FIELDS}
+    order["items"] = [
+        {field: row.get(field) or None for field in CSV_ITEM_FIELDS}
+        for row in rows
+    ]
+    return parse_order(order)
+
+
+class OrderImporter:
+    """
+    Acumula órdenes validadas y las inserta por lotes.
+
+    El reporte tiene una entrada por orden de la entrada, en orden:
+    {"index", "line", "status": "created" | "error", "id", "order_number"} o {..., "error"}.
+    """
+
+    def __init__(self, chunk_size: int = ORDER_IMPORT_CHUNK_SIZE):
+        from app.database import orders_collection
+
+        self.collection = orders_collection
+        self.chunk_size = chunk_size
+        self.results: List[Dict[str, Any]] = []
+        self.created = 0
+        self.failed = 0
+        self._pending: List[Dict[str, Any]] = []
+
+    def _next_entry(self, line: Optional[int]) -> Dict[str, Any]:
+        entry = {"index": len(self.results), "line": line}
+        self.results.append(entry)
+        return entry
+
+    def add_error(self, line: Optional[int], error: str) -> None:
+        entry = self._next_entry(line)
+        entry.update(status="error", error=error)
+        self.failed += 1
+
+    async def add(self, line: Optional[int], order: Order) -> None:
+        self._pending.append({"entry": self._next_entry(line), "order": order})
+        if len(self._pending) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        docs = build_order_docs([row["order"] for row in pending])
+        failed_indexes: Dict[int, str] = {}
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed_indexes = {
+                error["index"]: error.get("errmsg", "Error al insertar")
+                for error in e.details.get("writeErrors", [])
+            }
+        except Exception as e:
+            failed_indexes = {index: str(e) for index in range(len(docs))}
+
+        inserted = []
+        for index, (row, doc) in enumerate(zip(pending, docs)):
+            entry = row["entry"]
+            if index in failed_indexes:
+                entry.update(status="error", error=failed_indexes[index])
+                self.failed += 1
+            else:
+                entry.update(status="created", id=str(doc["_id"]), order_number=doc["order_number"])
+                self.created += 1
+                inserted.append(doc)
+
+        try:
+            await order_analytics.record_orders_created(inserted)
+        except Exception as e:
+            record_error("order_analytics")
+            print(f"Error al actualizar resúmenes de órdenes: {e}")
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "total": len(self.results),
+            "created": self.created,
+            "failed": self.failed,
+            "results": self.results
+        }
+
+
+async def import_json(importer: OrderImporter, orders: Any) -> None:
+    if not isinstance(orders, list):
+        raise ValueError("El cuerpo JSON debe ser una lista de órdenes")
+    for obj in orders:
+        try:
+            order = parse_order(obj)
+        except ValueError as e:
+            importer.add_error(None, str(e))
+            continue
+        await importer.add(None, order)
+    await importer.flush()
+
+
+async def import_ndjson(importer: OrderImporter, lines) -> None:
+    """lines: iterador asíncrono de (número de línea, objeto, error) como iter_ndjson"""
+    async for line_number, obj, error in lines:
+        try:
+            if error:
+                raise ValueError(error)
+            order = parse_order(obj)
+        except ValueError as e:
+            importer.add_error(line_number, str(e))
+            continue
+        await importer.add(line_number, order)
+    await importer.flush()
+
+
+async def import_csv(importer: OrderImporter, rows) -> None:
+    """
+    rows: iterador asíncrono de (número de línea, fila, error) como iter_csv.
+    Cada fila es un item; las filas consecutivas con el mismo order_ref forman una orden
+    (sin order_ref, cada fila es una orden).
+    """
+    group: List[Dict[str, str]] = []
+    group_line: Optional[int] = None
+
+    async def close_group():
+        if not group:
+            return
+        try:
+            order = order_from_csv_rows(group)
+        except ValueError as e:
+            importer.add_error(group_line, str(e))
+            return
+        await importer.add(group_line, order)
+
+    async for line_number, row, error in rows:
+        if error:
+            await close_group()
+            group, group_line = [], None
+            importer.add_error(line_number, error)
+            continue
+
+        order_ref = (row.get("order_ref") or "").strip()
+        if not group or not order_ref or order_ref != (group[0].get("order_ref") or "").strip():
+            await close_group()
+            group, group_line = [], line_number
+        group.append(row)
+
+    await close_group()
+    await importer.flush()
@@ -0,0 +1,146 @@
+"""
+Búsqueda de órdenes por número, nombre o email del cliente.
+
+Cada orden guarda `search_tokens`, calculados al escribir: palabras del nombre
+sin tildes y en minúsculas, el email completo, su dominio, las palabras de la
+parte local y el sufijo del número de orden. La búsqueda elige el índice según la forma de `q`:
+
+- Número de orden ("IBT-2024..."): prefijo anclado sobre `order_number` (índice único).
+- Palabras completas: índice de texto, ordenado por relevancia (textScore).
+- Prefijos (búsqueda mientras se escribe, "jua per"): prefijo anclado de cada token
+  sobre el índice multikey de `search_tokens`; entre los candidatos más recientes
+  se ordenan primero las coincidencias exactas.
+
+Uso por línea de comandos (desde backend/):
+
+    python -m app.services.order_search backfill   # órdenes guardadas sin search_tokens
+"""
+import asyncio
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from app.services.category_taxonomy import slugify
+
+load_dotenv()
+
+# Prefijo de los números de orden (IBT-AAAAMMDD-XXXXXXXXXXXXXXXX)
+ORDER_NUMBER_PREFIX = "IBT"
+
+# Órdenes candidatas (las más recientes) que se ordenan por relevancia en la búsqueda por prefijo
+ORDER_SEARCH_MAX_CANDIDATES = int(os.getenv("ORDER_SEARCH_MAX_CANDIDATES", "1000"))
+
+# Órdenes actualizadas por cada bulk_write del backfill
+BACKFILL_BATCH_SIZE = int(os.getenv("ORDER_SEARCH_BACKFILL_BATCH_SIZE", "1000"))
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in slugify(text or "").split("-") if word]
+
+
+def search_tokens(order_number: str, customer_name: str, customer_email: str) -> List[str]:
+    """Tokens normalizados de una orden (sin repetir, en orden de aparición)"""
+    email = (customer_email or "").strip().lower()
+    local_part, _, domain = email.partition("@")
+    tokens = _words(customer_name) + [token for token in (email, domain) if token] + _words(local_part)
+    tokens += _words(order_number)[-1:]
+    return list(dict.fromkeys(tokens))
+
+
+def _is_order_number(q: str) -> bool:
+    return q.upper().startswith(ORDER_NUMBER_PREFIX) and bool(re.search(r"\d", q))
+
+
+def _page(skip: int, limit: int) -> List[Dict[str, Any]]:
+    return [{"$skip": skip}, {"$limit": limit}]
+
+
+def order_number_pipeline(q: str, filter_query: Dict[str, Any], skip: int, limit: int) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {**filter_query, "order_number": {"$regex": f"^{re.escape(q.strip().upper())}"}}},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        *_page(skip, limit),
+    ]
+
+
+def text_pipeline(q: str, filter_query: Dict[str, Any], skip: int, limit: int) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {"$text": {"$search": q}, **filter_query}},
+        {"$sort": {"score": {"$meta": "textScore"}, "created_at": -1, "_id": -1}},
+        *_page(skip, limit),
+    ]
+
+
+def prefix_pipeline(tokens: List[str], filter_query: Dict[str, Any], skip: int, limit: int) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {
+            **filter_query,
+            "$and": [{"search_tokens": {"$regex": f"^{re.escape(token)}"}} for token in tokens]
+        }},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$limit": ORDER_SEARCH_MAX_CANDIDATES},
+        {"$addFields": {"search_rank": {"$size": {"$setIntersection": ["$search_tokens", tokens]}}}},
+        {"$sort": {"search_rank": -1, "created_at": -1, "_id": -1}},
+        *_page(skip, limit),
+        {"$project": {"search_rank": 0}},
+    ]
+
+
+async def search_orders(q: str, filter_query: Dict[str, Any], skip: int, limit: int,
+                        projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Órdenes que coinciden con q (y con filter_query), ordenadas por relevancia"""
+    from app.database import orders_collection
+
+    # La proyección va al final del pipeline: el orden por relevancia necesita search_tokens
+    project = [{"$project": projection}] if projection else []
+
+    if _is_order_number(q):
+        pipeline = order_number_pipeline(q, filter_query, skip, limit)
+        return await orders_collection.aggregate(pipeline + project).to_list(length=limit)
+
+    tokens = list(dict.fromkeys(_words(q)))
+    if not tokens:
+        return []
+
+    # El índice de texto separa los emails en palabras: se buscan por prefijo
+    if "@" not in q:
+        pipeline = text_pipeline(q, filter_query, skip, limit)
+        orders = await orders_collection.aggregate(pipeline + project).to_list(length=limit)
+        if orders or skip:
+            return orders
+    else:
+        tokens = [q.strip().lower()]
+
+    # Sin palabras completas que coincidan: búsqueda por prefijo
+    pipeline = prefix_pipeline(tokens, filter_query, skip, limit)
+    return await orders_collection.aggregate(pipeline + project).to_list(length=limit)
+
+
+async def backfill_search_tokens(batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, int]:
+    """Calcular search_tokens en las órdenes que no los tienen, por lotes de bulk_write"""
+    from app.database import orders_collection
+
+    scanned = updated = 0
+    operations: List[UpdateOne] = []
+    projection = {"order_number": 1, "customer_name": 1, "customer_email": 1}
+
+    async for order in orders_collection.find({"search_tokens": {"$exists": False}}, projection):
+        scanned += 1
+        tokens = search_tokens(order.get("order_number"), order.get("customer_name"), order.get("customer_email"))
+        operations.append(UpdateOne({"_id": order["_id"]}, {"$set": {"search_tokens": tokens}}))
+        if len(operations) >= batch_size:
+            updated += (await orders_collection.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+
+    if operations:
+        updated += (await orders_collection.bulk_write(operations, ordered=False)).modified_count
+    return {"scanned": scanned, "updated": updated}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print("Uso: python -m app.services.order_search backfill")
+        sys.exit(2)
+    print(asyncio.run(backfill_search_tokens()))
@@ -0,0 +1,246 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import bson
+from dotenv import load_dotenv
+from app.database import products_collection
+
+load_dotenv()
+
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "5000"))
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "60"))
+# Segundo nivel compartido opcional (Redis o compatible), p. ej. redis://localhost:6379/0
+PRODUCT_CACHE_REDIS_URL = os.getenv("PRODUCT_CACHE_REDIS_URL")
+
+SHARED_KEY_PREFIX = "ibiztrack:product:"
+
+
+class SharedCache(ABC):
+    """Interfaz del segundo nivel de caché (compartido entre procesos)"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+
+class InMemorySharedCache(SharedCache):
+    """Implementación local del segundo nivel, para desarrollo y pruebas"""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[float, bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._values[key]
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._values[key] = (time.monotonic() + ttl_seconds, value)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._values.pop(key, None)
+
+
+class RedisSharedCache(SharedCache):
+    """Segundo nivel sobre Redis (requiere el paquete opcional `redis`)"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        await self._redis.set(key, value, px=int(ttl_seconds * 1000))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._redis.delete(*keys)
+
+
+class TierStats:
+    """Aciertos, fallos y latencia acumulada de un nivel de caché"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.time_ms = 0.0
+
+    def record(self, hit: bool, started: float) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.time_ms += (time.perf_counter() - started) * 1000
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_latency_ms": round(self.time_ms / lookups, 4) if lookups else 0.0
+        }
+
+
+class ProductCache:
+    """
+    Caché read-through de documentos de productos por ASIN, delante de products_collection.
+
+    Nivel 1: LRU en el proceso, acotado y con TTL.
+    Nivel 2 (opcional): caché compartida tipo Redis, con documentos codificados en BSON.
+    Las escrituras de productos deben llamar a invalidate() para ambos niveles.
+    Los documentos devueltos se comparten entre llamadores y no deben modificarse.
+
+    Una lectura que estaba en curso cuando se invalidó su ASIN devuelve lo que leyó
+    pero no lo guarda en la caché: así no se vuelve a guardar el documento anterior a
+    la escritura. Las invalidaciones de otros procesos solo se ven en el segundo nivel
+    (el primero se corrige al vencer su TTL).
+    """
+
+    def __init__(self, max_size: int = 5000, ttl_seconds: float = 60, shared: Optional[SharedCache] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._stats = {"local": TierStats(), "shared": TierStats(), "database": TierStats()}
+        # ASINs con lecturas en curso: [lecturas, generación]; invalidate() sube la generación
+        self._loads: Dict[str, List[int]] = {}
+
+    def _get_local(self, asin: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(asin)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._local[asin]
+            return None
+        self._local.move_to_end(asin)
+        return entry[1]
+
+    def _set_local(self, asin: str, doc: Dict[str, Any]) -> None:
+        self._local[asin] = (time.monotonic() + self.ttl_seconds, doc)
+        self._local.move_to_end(asin)
+        if len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    async def _get_shared(self, asin: str) -> Optional[Dict[str, Any]]:
+        stats = self._stats["shared"]
+        started = time.perf_counter()
+        try:
+            raw = await self.shared.get(SHARED_KEY_PREFIX + asin)
+        except Exception as e:
+            stats.errors += 1
+            print(f"Error leyendo la caché compartida de productos: {e}")
+            return None
+        try:
+            doc = bson.decode(raw) if raw else None
+        except Exception as e:
+            # Valor corrupto o de otro formato: se trata como fallo y se lee de MongoDB
+            stats.errors += 1
+            print(f"Error decodificando la caché compartida de productos: {e}")
+            doc = None
+        stats.record(doc is not None, started)
+        return doc
+
+    async def _set_shared(self, asin: str, doc: Dict[str, Any]) -> None:
+        try:
+            await self.shared.set(SHARED_KEY_PREFIX + asin, bson.encode(doc), self.ttl_seconds)
+        except Exception as e:
+            self._stats["shared"].errors += 1
+            print(f"Error escribiendo la caché compartida de productos: {e}")
+
+    def _start_load(self, asin: str) -> int:
+        entry = self._loads.setdefault(asin, [0, 0])
+        entry[0] += 1
+        return entry[1]
+
+    def _finish_load(self, asin: str, generation: int) -> bool:
+        """Terminar una lectura; devuelve False si el ASIN se invalidó mientras tanto"""
+        entry = self._loads[asin]
+        entry[0] -= 1
+        if entry[0] == 0:
+            del self._loads[asin]
+        return entry[1] == generation
+
+    async def get(self, asin: str) -> Optional[Dict[str, Any]]:
+        """Obtener el documento del producto: LRU local, luego caché compartida, luego MongoDB"""
+        started = time.perf_counter()
+        doc = self._get_local(asin)
+        self._stats["local"].record(doc is not None, started)
+        if doc is not None:
+            return doc
+
+        generation = self._start_load(asin)
+        try:
+            if self.shared is not None:
+                doc = await self._get_shared(asin)
+                if doc is not None:
+                    if self._finish_load(asin, generation):
+                        self._set_local(asin, doc)
+                    return doc
+
+            started = time.perf_counter()
+            doc = await products_collection.find_one({"asin": asin})
+            self._stats["database"].record(doc is not None, started)
+        except BaseException:
+            self._finish_load(asin, generation)
+            raise
+
+        if self._finish_load(asin, generation) and doc is not None:
+            self._set_local(asin, doc)
+            if self.shared is not None:
+                await self._set_shared(asin, doc)
+        return doc
+
+    async def invalidate(self, asins: Iterable[str]) -> None:
+        """Quitar productos de ambos niveles (llamar después de escribirlos)"""
+        asins = list(asins)
+        for asin in asins:
+            self._local.pop(asin, None)
+            entry = self._loads.get(asin)
+            if entry is not None:
+                entry[1] += 1
+        if self.shared is not None and asins:
+            try:
+                await self.shared.delete(*(SHARED_KEY_PREFIX + asin for asin in asins))
+            except Exception as e:
+                self._stats["shared"].errors += 1
+                print(f"Error invalidando la caché compartida de productos: {e}")
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Aciertos y latencia por nivel"""
+        return {
+            "local_size": len(self._local),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "shared_enabled": self.shared is not None,
+            "tiers": {tier: stats.as_dict() for tier, stats in self._stats.items()}
+        }
+
+
+product_cache = ProductCache(
+    max_size=PRODUCT_CACHE_SIZE,
+    ttl_seconds=PRODUCT_CACHE_TTL_SECONDS,
+    shared=RedisSharedCache(PRODUCT_CACHE_REDIS_URL) if PRODUCT_CACHE_REDIS_URL else None
+)
@@ -0,0 +1,148 @@
+import csv
+import json
+import os
+import random
+from typing import Any, Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+from app.services.search_index import SearchIndex
+
+load_dotenv()
+
+# Archivo opcional con el catálogo (JSON, NDJSON o CSV)
+CATALOG_FILE = os.getenv("CATALOG_FILE")
+
+CSV_FLOAT_FIELDS = ("price", "weight")
+CSV_DIMENSION_FIELDS = ("length", "width", "height")
+
+# Peso de cada campo en el ranking de búsqueda
+SEARCH_FIELD_WEIGHTS = {"title": 3.0, "category": 2.0, "description": 1.0}
+
+
+class ProductCatalog:
+    """
+    Catálogo de productos en memoria, construido una sola vez e indexado:
+    - índice hash por ASIN
+    - índice por categoría (normalizada en minúsculas)
+    - índice invertido con ranking BM25 sobre título, categoría y descripción
+    """
+
+    def __init__(self, products: Iterable[Dict[str, Any]] = ()):
+        self._products: List[Dict[str, Any]] = []
+        self._by_asin: Dict[str, int] = {}
+        self._by_category: Dict[str, List[int]] = {}
+        self._category_keys: List[str] = []
+        self._search_index = SearchIndex(SEARCH_FIELD_WEIGHTS)
+
+        for product in products:
+            self.add(product)
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __contains__(self, asin: str) -> bool:
+        return asin in self._by_asin
+
+    def add(self, product: Dict[str, Any]) -> None:
+        """Agregar o reemplazar un producto manteniendo los índices"""
+        asin = product["asin"]
+        category_key = (product.get("category") or "").lower()
+
+        position = self._by_asin.get(asin)
+        if position is not None:
+            previous_key = self._category_keys[position]
+            if previous_key != category_key:
+                self._by_category[previous_key].remove(position)
+                self._by_category.setdefault(category_key, []).append(position)
+            self._products[position] = product
+            self._category_keys[position] = category_key
+        else:
+            position = len(self._products)
+            self._products.append(product)
+            self._category_keys.append(category_key)
+            self._by_asin[asin] = position
+            self._by_category.setdefault(category_key, []).append(position)
+
+        self._search_index.add(position, product)
+
+    def get(self, asin: str) -> Optional[Dict[str, Any]]:
+        """Obtener un producto por ASIN en O(1)"""
+        position = self._by_asin.get(asin)
+        return self._products[position] if position is not None else None
+
+    def categories(self) -> List[str]:
+        """Categorías normalizadas presentes en el catálogo"""
+        return [key for key, positions in self._by_category.items() if positions]
+
+    def _category_positions(self, category: str) -> List[int]:
+        """Posiciones de los productos cuya categoría contiene el texto dado"""
+        category = category.lower()
+        matching_keys = [key for key in self._by_category if category in key]
+        if len(matching_keys) == 1:
+            return self._by_category[matching_keys[0]]
+        return sorted(position for key in matching_keys for position in self._by_category[key])
+
+    def search(self, query: str = "", category: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Buscar productos ordenados por relevancia (BM25), con coincidencia por prefijo
+        del último término. Sin query se listan los productos de la categoría en orden.
+        """
+        positions = self._category_positions(category) if category else None
+
+        if not query or not query.strip():
+            positions = positions if positions is not None else range(len(self._products))
+            return [self._products[position] for position in positions[:limit]]
+
+        allowed = set(positions) if positions is not None else None
+        return [
+            self._products[position]
+            for position, _ in self._search_index.search(query, limit, allowed=allowed)
+        ]
+
+    def sample(self, count: int) -> List[Dict[str, Any]]:
+        """Muestra aleatoria de productos sin copiar el catálogo"""
+        positions = random.sample(range(len(self._products)), min(count, len(self._products)))
+        return [self._products[position] for position in positions]
+
+    @classmethod
+    def from_file(cls, path: str) -> "ProductCatalog":
+        """Cargar el catálogo desde un archivo JSON (lista), NDJSON o CSV"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            return cls(_read_csv_products(path))
+        if extension in (".ndjson", ".jsonl"):
+            return cls(_read_ndjson_products(path))
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+
+def _read_ndjson_products(path: str) -> Iterable[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _read_csv_products(path: str) -> Iterable[Dict[str, Any]]:
+    """
+    Leer productos desde CSV. Columnas: asin, title, price, weight, category,
+    description, image_url, availability y dimensions (JSON) o length/width/height.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            product: Dict[str, Any] = {
+                key: value for key, value in row.items()
+                if key not in CSV_DIMENSION_FIELDS and value not in (None, "")
+            }
+            for field in CSV_FLOAT_FIELDS:
+                if field in product:
+                    product[field] = float(product[field])
+            if "availability" in product:
+                product["availability"] = product["availability"].strip().lower() in ("1", "true", "yes", "si", "sí")
+            if "dimensions" in product:
+                product["dimensions"] = json.loads(product["dimensions"])
+            elif any(row.get(field) for field in CSV_DIMENSION_FIELDS):
+                product["dimensions"] = {
+                    field: float(row[field]) for field in CSV_DIMENSION_FIELDS if row.get(field)
+                }
+            yield product
@@ -0,0 +1,81 @@
+import datetime
+from typing import Any, Dict, List, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.models.product import Product
+from app.database import products_collection
+from app.services.product_cache import product_cache
+from app.services.category_taxonomy import category_taxonomy
+from app.instrumentation import record_error
+
+
+def build_product_doc(product: Product, senae_category: str, tariff_calculation: dict) -> Dict[str, Any]:
+    """Documento de MongoDB para un producto con su cálculo SENAE"""
+    return {
+        "asin": product.asin,
+        "title": product.title,
+        "price": product.price,
+        "weight": product.weight,
+        "dimensions": product.dimensions,
+        "image_url": product.image_url,
+        "category": product.category,
+        "category_key": category_taxonomy.normalize(product.category),
+        "description": product.description,
+        "availability": product.availability,
+        "senae_category": senae_category,
+        "calculated_tariff": tariff_calculation,
+        # Entradas y versión de tarifas con las que se calculó calculated_tariff
+        "tariff_inputs": {
+            "price": product.price,
+            "weight": product.weight or 1.0,
+            "product_type": product.category or "general",
+            "senae_category": senae_category,
+            "rate_table_version": tariff_calculation.get("rate_table_version")
+        },
+        "tariff_stale": False,
+        "updated_at": datetime.datetime.utcnow()
+    }
+
+
+async def save_products_to_db(items: List[Tuple[Product, str, dict]]) -> Dict[str, Any]:
+    """
+    Guardar varios productos con un solo bulk_write no ordenado de upserts por ASIN.
+
+    Recibe tuplas (producto, categoría SENAE, cálculo de tarifa) y devuelve
+    {"saved": n, "failed": [{"asin": ..., "error": ...}]}. Si un ASIN se repite
+    se guarda solo su última versión.
+    """
+    docs: Dict[str, Dict[str, Any]] = {}
+    for product, senae_category, tariff_calculation in items:
+        docs[product.asin] = build_product_doc(product, senae_category, tariff_calculation)
+
+    if not docs:
+        return {"saved": 0, "failed": []}
+
+    asins = list(docs)
+    operations = [
+        UpdateOne(
+            {"asin": asin},
+            {"$set": doc, "$setOnInsert": {"created_at": doc["updated_at"]}},
+            upsert=True
+        )
+        for asin, doc in docs.items()
+    ]
+
+    try:
+        await products_collection.bulk_write(operations, ordered=False)
+        await product_cache.invalidate(asins)
+        return {"saved": len(operations), "failed": []}
+    except BulkWriteError as e:
+        await product_cache.invalidate(asins)
+        failed = [
+            {"asin": asins[error["index"]], "error": error.get("errmsg", "")}
+            for error in e.details.get("writeErrors", [])
+        ]
+        record_error("product_persistence")
+        print(f"Error guardando {len(failed)} productos en DB: {failed}")
+        return {"saved": len(operations) - len(failed), "failed": failed}
+    except Exception as e:
+        record_error("product_persistence")
+        print(f"Error guardando productos en DB: {e}")
+        return {"saved": 0, "failed": [{"asin": asin, "error": str(e)} for asin in asins]}
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.models.product import Product
+from app.services.product_persistence import save_products_to_db
+from app.instrumentation import record_error
+
+load_dotenv()
+
+# Configuración de la cola write-behind (desactivada por defecto)
+WRITE_BEHIND_ENABLED = os.getenv("PRODUCT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_MAX_SIZE = int(os.getenv("PRODUCT_WRITE_BEHIND_MAX_SIZE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("PRODUCT_WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("PRODUCT_WRITE_BEHIND_FLUSH_INTERVAL_MS", "50")) / 1000
+
+ProductWrite = Tuple[Product, str, dict]
+
+
+class ProductWriteBehind:
+    """
+    Cola write-behind para guardar productos en MongoDB sin bloquear las respuestas.
+
+    - Cola asyncio acotada: si se llena, enqueue espera (contrapresión)
+    - ASINs repetidos mientras esperan se fusionan y se guarda solo la última versión
+    - Un worker agrupa los ASINs pendientes en lotes y los guarda con bulk_write
+    - stop() vacía la cola antes de terminar; lo que llega durante stop() se guarda directamente
+    """
+
+    def __init__(self, max_size: int = 10000, batch_size: int = 500, flush_interval: float = 0.05):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, ProductWrite] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        # enqueue() esperando lugar en la cola (el worker no termina hasta atenderlos)
+        self._waiting_puts = 0
+        self._metrics = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "flushed": 0,
+            "failed": 0,
+            "flushes": 0,
+            "flush_time_ms": 0.0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    @property
+    def accepting(self) -> bool:
+        """Si la cola acepta escrituras (activa y sin stop() en curso)"""
+        return self.running and not self._stopping
+
+    def start(self) -> None:
+        """Iniciar el worker en el event loop actual"""
+        if self.running:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Vaciar la cola y detener el worker"""
+        if not self.running:
+            return
+        # Desde aquí enqueue guarda directamente en lugar de encolar detrás del final
+        self._stopping = True
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+
+    async def enqueue(self, item: ProductWrite) -> None:
+        """Encolar un producto (producto, categoría SENAE, cálculo de tarifa)"""
+        asin = item[0].asin
+        self._metrics["enqueued"] += 1
+        if self._stopping or not self.running:
+            await self._flush([item])
+            return
+        if asin in self._pending:
+            self._pending[asin] = item
+            self._metrics["coalesced"] += 1
+            return
+        # Se agrega a _pending solo con lugar en la cola, así queue_depth nunca supera max_size
+        self._waiting_puts += 1
+        try:
+            await self._queue.put(asin)
+        finally:
+            self._waiting_puts -= 1
+        if asin in self._pending:
+            # Otro enqueue del mismo ASIN obtuvo lugar mientras este esperaba
+            self._metrics["coalesced"] += 1
+        self._pending[asin] = item
+
+    async def enqueue_many(self, items: List[ProductWrite]) -> None:
+        for item in items:
+            await self.enqueue(item)
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            asin = await self._queue.get()
+            if asin is None:
+                break
+
+            batch = [asin]
+            waited = False
+            while len(batch) < self.batch_size:
+                try:
+                    asin = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    # Esperar una vez a que se junten más escrituras antes de guardar
+                    if waited or not self.flush_interval:
+                        break
+                    waited = True
+                    await asyncio.sleep(self.flush_interval)
+                    continue
+                if asin is None:
+                    stopping = True
+                    break
+                batch.append(asin)
+
+            await self._flush([self._pending.pop(asin) for asin in batch if asin in self._pending])
+
+        # Escrituras que quedaron detrás del final o que todavía esperan lugar en la cola
+        while self._pending or self._waiting_puts or not self._queue.empty():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            if self._pending:
+                asins = list(self._pending)[:self.batch_size]
+                await self._flush([self._pending.pop(asin) for asin in asins])
+            else:
+                await asyncio.sleep(0)
+
+    async def _flush(self, items: List[ProductWrite]) -> None:
+        if not items:
+            return
+        start = time.perf_counter()
+        try:
+            result = await save_products_to_db(items)
+            failed = len(result["failed"])
+        except Exception as e:
+            record_error("product_write_behind")
+            print(f"Error en write-behind de productos: {e}")
+            failed = len(items)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self._metrics["flushes"] += 1
+        self._metrics["flushed"] += len(items) - failed
+        self._metrics["failed"] += failed
+        self._metrics["flush_time_ms"] += elapsed_ms
+        self._metrics["last_flush_ms"] = elapsed_ms
+        self._metrics["max_flush_ms"] = max(self._metrics["max_flush_ms"], elapsed_ms)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Profundidad de la cola, contadores y latencia de guardado"""
+        flushes = self._metrics["flushes"]
+        return {
+            "running": self.running,
+            "queue_depth": len(self._pending),
+            "max_size": self.max_size,
+            "enqueued": self._metrics["enqueued"],
+            "coalesced": self._metrics["coalesced"],
+            "flushed": self._metrics["flushed"],
+            "failed": self._metrics["failed"],
+            "flushes": flushes,
+            "last_flush_ms": round(self._metrics["last_flush_ms"], 3),
+            "avg_flush_ms": round(self._metrics["flush_time_ms"] / flushes, 3) if flushes else 0.0,
+            "max_flush_ms": round(self._metrics["max_flush_ms"], 3)
+        }
+
+
+product_write_behind = ProductWriteBehind(
+    max_size=WRITE_BEHIND_MAX_SIZE,
+    batch_size=WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=WRITE_BEHIND_FLUSH_INTERVAL
+)
+
+
+async def persist_products(items: List[ProductWrite]) -> Optional[Dict[str, Any]]:
+    """
+    Guardar productos: en segundo plano si la cola write-behind está activa
+    (devuelve None), o de inmediato con bulk_write (devuelve el resultado).
+    """
+    if product_write_behind.accepting:
+        await product_write_behind.enqueue_many(items)
+        return None
+    return await save_products_to_db(items)
@@ -0,0 +1,157 @@
+import json
+import os
+from typing import Callable, Dict, List, NamedTuple, Optional
+from dotenv import load_dotenv
+from app.models.rate_table import RateTableConfig
+
+load_dotenv()
+
+# Archivo versionado con las tarifas SENAE
+SENAE_RATES_FILE = os.getenv(
+    "SENAE_RATES_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "senae_rates.json")
+)
+
+# Longitudes de partida arancelaria consultadas, de la más específica a la más general
+HS_CODE_LENGTHS = (10, 8, 6, 4, 2)
+
+
+class SpecificRate(NamedTuple):
+    """Tarifa específica de un tipo de producto: por kg o por par"""
+    per_kg: float
+    per_pair: Optional[float]
+
+
+class RateTable:
+    """
+    Tabla de tarifas SENAE compilada para consultas O(1).
+
+    Es inmutable: para cambiar tarifas se compila una tabla nueva y se reemplaza
+    completa en el registro, así cada cálculo usa una sola versión de principio a fin.
+    """
+
+    def __init__(self, config: RateTableConfig):
+        self.config = config
+        self.version = config.version
+        self.iva_rate = config.iva_rate
+        self.fodinfa_rate = config.fodinfa_rate
+
+        b, c, d = config.category_b, config.category_c, config.category_d
+        self.b_max_weight, self.b_max_value = b.max_weight, b.max_value
+        self.b_fixed_tariff = b.fixed_tariff
+        self.b_annual_limits = sorted(
+            (limit.max_importations, limit.limit) for limit in b.annual_limits
+        )
+        self.c_max_weight, self.c_max_value = c.max_weight, c.max_value
+        self.c_tariff_rate = c.tariff_rate
+        self.d_max_weight, self.d_max_value = d.max_weight, d.max_value
+        self.d_adv_rate = d.adv_rate
+        self.d_inen_exemption_limit = d.inen_exemption_limit
+        self.d_keywords = tuple(keyword.lower() for keyword in d.keywords)
+
+        self.b_error = self._limit_error("B", b.max_weight, b.max_value)
+        self.c_error = self._limit_error("C", c.max_weight, c.max_value)
+        self.d_error = self._limit_error("D", d.max_weight, d.max_value)
+        self.b_max_importations = self.b_annual_limits[-1][0] if self.b_annual_limits else 0
+
+        if config.default_product_type.lower() not in {name.lower() for name in config.product_types}:
+            raise ValueError(f"Tipo de producto por defecto no definido: {config.default_product_type}")
+
+        self._specific_rates: Dict[str, SpecificRate] = {}
+        for name, rates in config.product_types.items():
+            if rates.specific_per_kg is None and rates.specific_per_pair is None:
+                raise ValueError(f"El tipo de producto {name} no define tarifa específica")
+            self._specific_rates[name.lower()] = SpecificRate(rates.specific_per_kg or 0.0, rates.specific_per_pair)
+        self._default_specific_rate = self._specific_rates[config.default_product_type.lower()]
+
+        self._hs_tariff_rates = {
+            code: rates.tariff_rate for code, rates in config.hs_codes.items() if rates.tariff_rate is not None
+        }
+        self._hs_adv_rates = {
+            code: rates.adv_rate for code, rates in config.hs_codes.items() if rates.adv_rate is not None
+        }
+
+    @staticmethod
+    def _limit_error(category: str, max_weight: float, max_value: float) -> str:
+        max_value_text = f"{max_value:,.0f}".replace(",", ".")
+        return f"Producto no califica para categoría {category} (máximo {max_weight:g}kg y ${max_value_text})"
+
+    @staticmethod
+    def _hs_lookup(rates: Dict[str, float], hs_code: Optional[str], default: float) -> float:
+        if not hs_code or not rates:
+            return default
+        digits = "".join(char for char in str(hs_code) if char.isdigit())
+        for length in HS_CODE_LENGTHS:
+            rate = rates.get(digits[:length]) if len(digits) >= length else None
+            if rate is not None:
+                return rate
+        return default
+
+    def annual_limit(self, importations_count: int) -> Optional[int]:
+        """Cupo anual de categoría B según el número de importaciones (None si se excede)"""
+        for max_importations, limit in self.b_annual_limits:
+            if importations_count <= max_importations:
+                return limit
+        return None
+
+    def tariff_rate(self, hs_code: Optional[str] = None) -> float:
+        """Arancel ad valorem de categoría C para una partida arancelaria"""
+        return self._hs_lookup(self._hs_tariff_rates, hs_code, self.c_tariff_rate)
+
+    def adv_rate(self, hs_code: Optional[str] = None) -> float:
+        """ADV de categoría D para una partida arancelaria"""
+        return self._hs_lookup(self._hs_adv_rates, hs_code, self.d_adv_rate)
+
+    def specific_rate(self, product_type: str) -> SpecificRate:
+        """Tarifa específica de categoría D para un tipo de producto"""
+        return self._specific_rates.get(product_type.lower(), self._default_specific_rate)
+
+    @classmethod
+    def from_file(cls, path: str) -> "RateTable":
+        with open(path, encoding="utf-8") as f:
+            return cls(RateTableConfig(**json.load(f)))
+
+
+class RateTableRegistry:
+    """
+    Registro de la tabla de tarifas vigente.
+
+    swap() reemplaza la tabla con una sola asignación: las peticiones en curso
+    terminan con la tabla que tomaron y las nuevas usan la nueva. Los listeners
+    (p. ej. la caché de tarifas) se notifican después de cada cambio.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._table: Optional[RateTable] = None
+        self._listeners: List[Callable[[RateTable], None]] = []
+
+    def current(self) -> RateTable:
+        table = self._table
+        if table is None:
+            table = self._table = RateTable.from_file(self.path)
+        return table
+
+    def swap(self, table: RateTable) -> RateTable:
+        """Reemplazar la tabla vigente; devuelve la anterior"""
+        previous, self._table = self._table, table
+        for listener in self._listeners:
+            listener(table)
+        return previous
+
+    def reload(self, path: Optional[str] = None) -> RateTable:
+        """Compilar la tabla desde el archivo y reemplazar la vigente solo si es válida"""
+        table = RateTable.from_file(path or self.path)
+        self.swap(table)
+        return table
+
+    def add_listener(self, listener: Callable[[RateTable], None]) -> None:
+        self._listeners.append(listener)
+
+
+rate_tables = RateTableRegistry(SENAE_RATES_FILE)
+
+
+def get_rate_table() -> RateTable:
+    """Tabla de tarifas SENAE vigente"""
+    return rate_tables.current()
@@ -0,0 +1,180 @@
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from heapq import nlargest
+from typing import Collection, Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Palabras vacías en español e inglés que no aportan a la búsqueda
+STOPWORDS = frozenset({
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "los", "o", "para", "por", "un", "una", "y",
+    "and", "an", "for", "in", "of", "on", "or", "the", "to", "with"
+})
+
+# Parámetros BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Máximo de términos en los que se expande un prefijo (type-ahead)
+MAX_PREFIX_EXPANSIONS = 50
+
+# Un término presente en más de esta fracción de documentos (y al menos en
+# COMMON_TERM_MIN_DOCS) solo re-puntúa los candidatos encontrados por términos
+# más raros, para no recorrer listas de postings enormes
+COMMON_TERM_RATIO = 0.05
+COMMON_TERM_MIN_DOCS = 1000
+
+
+def fold_accents(text: str) -> str:
+    """Quitar tildes y diacríticos (canción -> cancion, niño -> nino)"""
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(token: str) -> str:
+    """
+    Stemming ligero para español e inglés: plurales y 'e' final.
+    zapatos -> zapato, relojes -> reloj, canciones -> cancion, batteries -> battery
+    """
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    if len(token) > 3 and token.endswith("e"):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Normalizar (minúsculas, sin tildes) y separar en tokens, sin palabras vacías"""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(fold_accents(text.lower())) if token not in STOPWORDS]
+
+
+class SearchIndex:
+    """
+    Índice invertido con ranking BM25 para búsqueda de texto completo.
+
+    Cada documento se indexa por campos con pesos distintos (p. ej. el título pesa
+    más que la descripción). Soporta altas, bajas y reemplazos incrementales y
+    coincidencia por prefijo del último término de la consulta (type-ahead).
+    """
+
+    def __init__(self, field_weights: Dict[str, float]):
+        self.field_weights = field_weights
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        self._sorted_terms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, doc_id: int, fields: Dict[str, Optional[str]]) -> None:
+        """Indexar (o reindexar) un documento"""
+        if doc_id in self._doc_lengths:
+            self.remove(doc_id)
+
+        frequencies: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in self.field_weights.items():
+            for token in tokenize(fields.get(field)):
+                term = stem(token)
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+                length += weight
+
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._sorted_terms, term)
+            postings[doc_id] = frequency
+
+        self._doc_terms[doc_id] = tuple(frequencies)
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: int) -> None:
+        """Quitar un documento del índice"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                del self._sorted_terms[bisect_left(self._sorted_terms, term)]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        """Términos del índice que empiezan con el prefijo dado"""
+        terms = []
+        position = bisect_left(self._sorted_terms, prefix)
+        while position < len(self._sorted_terms) and len(terms) < MAX_PREFIX_EXPANSIONS:
+            term = self._sorted_terms[position]
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+            position += 1
+        return terms
+
+    def _query_terms(self, query: str, prefix: bool) -> Dict[str, float]:
+        """Términos de la consulta con su peso (los de prefijo pesan menos que los exactos)"""
+        tokens = tokenize(query)
+        terms: Dict[str, float] = {}
+        for token in tokens:
+            terms[stem(token)] = 1.0
+        if prefix and tokens:
+            for term in self._prefix_terms(tokens[-1]):
+                terms.setdefault(term, 0.5)
+        return terms
+
+    def search(
+            self,
+            query: str,
+            limit: int = 10,
+            allowed: Optional[Collection[int]] = None,
+            prefix: bool = True
+    ) -> List[Tuple[int, float]]:
+        """
+        Devolver los `limit` documentos con mayor puntaje BM25 como (doc_id, score).
+        `allowed` restringe la búsqueda a un subconjunto de documentos (p. ej. una categoría).
+        """
+        doc_count = len(self._doc_lengths)
+        if not doc_count:
+            return []
+        average_length = self._total_length / doc_count or 1.0
+
+        query_terms = [
+            (term, query_weight, self._postings[term])
+            for term, query_weight in self._query_terms(query, prefix).items()
+            if term in self._postings
+        ]
+        # Procesar primero los términos más raros
+        query_terms.sort(key=lambda item: len(item[2]))
+
+        scores: Dict[int, float] = {}
+        for term, query_weight, postings in query_terms:
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            if scores and len(postings) > max(COMMON_TERM_RATIO * doc_count, COMMON_TERM_MIN_DOCS):
+                matches = [(doc_id, postings[doc_id]) for doc_id in scores if doc_id in postings]
+            elif allowed is None:
+                matches = postings.items()
+            elif len(allowed) < len(postings):
+                matches = [(doc_id, postings[doc_id]) for doc_id in allowed if doc_id in postings]
+            else:
+                matches = [(doc_id, frequency) for doc_id, frequency in postings.items() if doc_id in allowed]
+            for doc_id, frequency in matches:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[doc_id] / average_length)
+                score = query_weight * idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        # Empates: se prefiere el documento indexado primero
+        return nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
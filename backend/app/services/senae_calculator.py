@@ -1,13 +1,50 @@
-from typing import Dict, Any
+from numbers import Real
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import numpy as np
 # from backend.app.models.order import SenaeCategory
 from app.models.order import SenaeCategory
+from app.services.rate_tables import RateTable, get_rate_table
+from app.instrumentation import timed
+
+
+def is_number(value: Any) -> bool:
+    """Si un valor o peso es numérico (los booleanos no lo son, aunque Python los trate como int)"""
+    # type() primero: isinstance contra la ABC Real es lento en el cálculo escalar
+    return type(value) in (int, float) or (isinstance(value, Real) and not isinstance(value, bool))
+
+
+def _numeric_column(column: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Columna como float64 y máscara de las filas numéricas (según is_number). Las demás
+    quedan en NaN y pasan por el cálculo escalar, que devuelve su error sin afectar al
+    resto del lote.
+    """
+    if isinstance(column, np.ndarray):
+        if column.ndim == 1 and column.dtype.kind in "iuf":
+            return column.astype(np.float64, copy=False), np.ones(len(column), dtype=bool)
+    elif set(map(type, column)) <= {int, float}:
+        # Caso habitual: solo int y float (np.asarray convertiría True en 1.0)
+        return np.asarray(column, dtype=np.float64), np.ones(len(column), dtype=bool)
+    numeric = np.fromiter((is_number(x) for x in column), dtype=bool, count=len(column))
+    array = np.array([float(x) if ok else np.nan for x, ok in zip(column, numeric.tolist())], dtype=np.float64)
+    return array, numeric
 
 
 class SenaeCalculator:
-    """Calculadora de tarifas SENAE según las categorías B, C y D"""
+    """
+    Calculadora de tarifas SENAE según las categorías B, C y D.
+
+    Las tarifas y límites vienen de la tabla versionada vigente (ver rate_tables);
+    cada resultado indica la versión usada en "rate_table_version".
+    """
 
     @staticmethod
-    def calculate_category_b_tariff(value: float, weight: float, importations_count: int = 1) -> Dict[str, Any]:
+    def calculate_category_b_tariff(
+            value: float,
+            weight: float,
+            importations_count: int = 1,
+            rates: Optional[RateTable] = None
+    ) -> Dict[str, Any]:
         """
         Categoría B: Paquetes hasta 4 Kg y US$ 400
         - Hasta 5 importaciones: $1.200 por destinatario al año
@@ -15,18 +52,18 @@ class SenaeCalculator:
         - Arancel: $42 por importación
         - Libre de tributos
         """
-        if weight > 4 or value > 400:
-            raise ValueError("Producto no califica para categoría B (máximo 4kg y $400)")
+        rates = rates or get_rate_table()
+        if weight > rates.b_max_weight or value > rates.b_max_value:
+            raise ValueError(rates.b_error)
 
-        tariff = 42.0  # Arancel fijo
+        tariff = rates.b_fixed_tariff  # Arancel fijo
 
         # Límites anuales
-        if importations_count <= 5:
-            annual_limit = 1200
-        elif importations_count <= 12:
-            annual_limit = 2400
-        else:
-            raise ValueError("Excede el límite de 12 importaciones anuales para categoría B")
+        annual_limit = rates.annual_limit(importations_count)
+        if annual_limit is None:
+            raise ValueError(
+                f"Excede el límite de {rates.b_max_importations} importaciones anuales para categoría B"
+            )
 
         return {
             "category": "B",
@@ -40,31 +77,38 @@ class SenaeCalculator:
             "total_cost": value + tariff,
             "importations_count": importations_count,
             "annual_limit": annual_limit,
-            "free_of_tributes": True
+            "free_of_tributes": True,
+            "rate_table_version": rates.version
         }
 
     @staticmethod
-    def calculate_category_c_tariff(value: float, weight: float) -> Dict[str, Any]:
+    def calculate_category_c_tariff(
+            value: float,
+            weight: float,
+            hs_code: Optional[str] = None,
+            rates: Optional[RateTable] = None
+    ) -> Dict[str, Any]:
         """
         Categoría C: Paquetes hasta 50 kg y $2.000
         - Requiere Documento de Control Previo según el producto (excepto INEN)
-        - Arancel: Depende del producto
+        - Arancel: Depende del producto (partida arancelaria, 10% por defecto)
         - IVA: 12%
         - FODINFA: 0.5%
         """
-        if weight > 50 or value > 2000:
-            raise ValueError("Producto no califica para categoría C (máximo 50kg y $2.000)")
+        rates = rates or get_rate_table()
+        if weight > rates.c_max_weight or value > rates.c_max_value:
+            raise ValueError(rates.c_error)
 
-        # Arancel variable según producto (simulamos 10% promedio)
-        tariff_rate = 0.10
+        # Arancel según la partida arancelaria (o el promedio de la tabla)
+        tariff_rate = rates.tariff_rate(hs_code)
         tariff = value * tariff_rate
 
-        # IVA 12%
-        iva_rate = 0.12
+        # IVA
+        iva_rate = rates.iva_rate
         iva = (value + tariff) * iva_rate
 
-        # FODINFA 0.5%
-        fodinfa_rate = 0.005
+        # FODINFA
+        fodinfa_rate = rates.fodinfa_rate
         fodinfa = value * fodinfa_rate
 
         total_taxes = tariff + iva + fodinfa
@@ -82,11 +126,18 @@ class SenaeCalculator:
             "adv": 0,
             "total_taxes": total_taxes,
             "total_cost": value + total_taxes,
-            "requires_control_document": True
+            "requires_control_document": True,
+            "rate_table_version": rates.version
         }
 
     @staticmethod
-    def calculate_category_d_tariff(value: float, weight: float, product_type: str = "textiles") -> Dict[str, Any]:
+    def calculate_category_d_tariff(
+            value: float,
+            weight: float,
+            product_type: str = "textiles",
+            hs_code: Optional[str] = None,
+            rates: Optional[RateTable] = None
+    ) -> Dict[str, Any]:
         """
         Categoría D: Prendas de vestir, textiles y calzado hasta 20 kg y $2.000
         - Requieren INEN (excepto primera vez al año con monto hasta $500)
@@ -95,37 +146,37 @@ class SenaeCalculator:
         - IVA: 12%
         - FODINFA: 0.5%
         """
-        if weight > 20 or value > 2000:
-            raise ValueError("Producto no califica para categoría D (máximo 20kg y $2.000)")
+        rates = rates or get_rate_table()
+        if weight > rates.d_max_weight or value > rates.d_max_value:
+            raise ValueError(rates.d_error)
 
-        # ADV 10%
-        adv_rate = 0.10
+        # ADV
+        adv_rate = rates.adv_rate(hs_code)
         adv = value * adv_rate
 
-        # Tarifa específica según tipo de producto
-        if product_type.lower() == "textiles":
-            specific_tariff = 5.5 * weight
-        elif product_type.lower() == "calzado":
+        # Tarifa específica según tipo de producto (por defecto textiles)
+        specific_rate = rates.specific_rate(product_type)
+        if specific_rate.per_pair is not None:
             # Asumimos 1 par por kg para simplificar
             pairs = max(1, int(weight))
-            specific_tariff = 6.0 * pairs
+            specific_tariff = specific_rate.per_pair * pairs
         else:
-            specific_tariff = 5.5 * weight  # Default textiles
+            specific_tariff = specific_rate.per_kg * weight
 
         total_tariff = adv + specific_tariff
 
-        # IVA 12%
-        iva_rate = 0.12
+        # IVA
+        iva_rate = rates.iva_rate
         iva = (value + total_tariff) * iva_rate
 
-        # FODINFA 0.5%
-        fodinfa_rate = 0.005
+        # FODINFA
+        fodinfa_rate = rates.fodinfa_rate
         fodinfa = value * fodinfa_rate
 
         total_taxes = total_tariff + iva + fodinfa
 
         # Verificar si requiere INEN
-        requires_inen = value > 500
+        requires_inen = value > rates.d_inen_exemption_limit
 
         return {
             "category": "D",
@@ -143,22 +194,28 @@ class SenaeCalculator:
             "total_taxes": total_taxes,
             "total_cost": value + total_taxes,
             "requires_inen": requires_inen,
-            "inen_exemption_limit": 500
+            "inen_exemption_limit": rates.d_inen_exemption_limit,
+            "rate_table_version": rates.version
         }
 
     @staticmethod
     def calculate_tariff(category: SenaeCategory, value: float, weight: float, **kwargs) -> Dict[str, Any]:
         """Método principal para calcular tarifas según categoría"""
+        rates = kwargs.get('rates') or get_rate_table()
         try:
+            if not is_number(value) or not is_number(weight):
+                raise ValueError("El valor y el peso deben ser numéricos")
             if category == SenaeCategory.B:
                 return SenaeCalculator.calculate_category_b_tariff(
-                    value, weight, kwargs.get('importations_count', 1)
+                    value, weight, kwargs.get('importations_count', 1), rates=rates
                 )
             elif category == SenaeCategory.C:
-                return SenaeCalculator.calculate_category_c_tariff(value, weight)
+                return SenaeCalculator.calculate_category_c_tariff(
+                    value, weight, kwargs.get('hs_code'), rates=rates
+                )
             elif category == SenaeCategory.D:
                 return SenaeCalculator.calculate_category_d_tariff(
-                    value, weight, kwargs.get('product_type', 'textiles')
+                    value, weight, kwargs.get('product_type', 'textiles'), kwargs.get('hs_code'), rates=rates
                 )
             else:
                 raise ValueError(f"Categoría SENAE no válida: {category}")
@@ -167,26 +224,272 @@ class SenaeCalculator:
                 "error": str(e),
                 "category": category,
                 "base_value": value,
-                "weight": weight
+                "weight": weight,
+                "rate_table_version": rates.version
             }
 
     @staticmethod
     def determine_category(value: float, weight: float, product_type: str = "") -> SenaeCategory:
         """Determinar automáticamente la categoría SENAE más apropiada"""
+        rates = get_rate_table()
         product_type_lower = product_type.lower()
 
         # Categoría D para textiles y calzado
-        if any(keyword in product_type_lower for keyword in ["textile", "ropa", "vestir", "calzado", "zapato"]):
-            if weight <= 20 and value <= 2000:
+        if any(keyword in product_type_lower for keyword in rates.d_keywords):
+            if weight <= rates.d_max_weight and value <= rates.d_max_value:
                 return SenaeCategory.D
 
         # Categoría B para productos pequeños y económicos
-        if weight <= 4 and value <= 400:
+        if weight <= rates.b_max_weight and value <= rates.b_max_value:
             return SenaeCategory.B
 
         # Categoría C para el resto
-        if weight <= 50 and value <= 2000:
+        if weight <= rates.c_max_weight and value <= rates.c_max_value:
             return SenaeCategory.C
 
         # Por defecto, categoría C
-        return SenaeCategory.C
\ No newline at end of file
+        return SenaeCategory.C
+
+    @staticmethod
+    def summarize_tariffs(
+            calculations: List[Dict[str, Any]],
+            total_tariffs: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Sumar los totales de tarifas de una lista de cálculos individuales.
+        Si se pasa total_tariffs, se continúa acumulando sobre esos totales (totales parciales).
+        """
+        if total_tariffs is None:
+            total_tariffs = {
+                "total_tariff": 0,
+                "total_iva": 0,
+                "total_fodinfa": 0,
+                "total_adv": 0,
+                "total_taxes": 0
+            }
+
+        for tariff_calculation in calculations:
+            if "total_tariff" in tariff_calculation:
+                total_tariffs["total_tariff"] += tariff_calculation.get("total_tariff", 0)
+            if "tariff" in tariff_calculation:
+                total_tariffs["total_tariff"] += tariff_calculation.get("tariff", 0)
+
+            total_tariffs["total_iva"] += tariff_calculation.get("iva", 0)
+            total_tariffs["total_fodinfa"] += tariff_calculation.get("fodinfa", 0)
+            total_tariffs["total_adv"] += tariff_calculation.get("adv", 0)
+
+        total_tariffs["total_taxes"] = (
+                total_tariffs["total_tariff"] +
+                total_tariffs["total_iva"] +
+                total_tariffs["total_fodinfa"] +
+                total_tariffs["total_adv"]
+        )
+        return total_tariffs
+
+    @staticmethod
+    @timed("senae.calculate_tariff_batch")
+    def calculate_tariff_batch(
+            categories: Sequence,
+            values: Sequence[float],
+            weights: Sequence[float],
+            product_types: Optional[Sequence[str]] = None,
+            importations_count: int = 1,
+            hs_codes: Optional[Sequence[Optional[str]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Cálculo vectorizado de tarifas para muchos items (manifiestos, órdenes grandes).
+
+        Recibe columnas (categoría, valor, peso, tipo de producto y opcionalmente
+        partida arancelaria) y devuelve
+        {"calculations": [...], "total_tariffs": {...}}. Cada cálculo es idéntico
+        al de calculate_tariff: se aplican las mismas operaciones en el mismo orden
+        sobre float64, y las filas inválidas (fuera de límites o con valor o peso
+        no numérico) pasan por el cálculo escalar para conservar exactamente el
+        mismo error sin hacer fallar el lote. Todo el lote usa la misma
+        versión de la tabla de tarifas.
+        """
+        n = len(categories)
+        if len(values) != n or len(weights) != n:
+            raise ValueError("Las columnas category, value y weight deben tener la misma longitud")
+        if product_types is None:
+            product_types = ["textiles"] * n
+        elif len(product_types) != n:
+            raise ValueError("La columna product_type debe tener la misma longitud que category")
+        if hs_codes is None:
+            hs_codes = [None] * n
+        elif len(hs_codes) != n:
+            raise ValueError("La columna hs_code debe tener la misma longitud que category")
+
+        rates = get_rate_table()
+
+        calculations: List[Optional[Dict[str, Any]]] = [None] * n
+        row_tariff = np.zeros(n)
+        row_iva = np.zeros(n)
+        row_fodinfa = np.zeros(n)
+        row_adv = np.zeros(n)
+
+        if n:
+            category_arr = np.empty(n, dtype=object)
+            category_arr[:] = categories
+            value, value_ok = _numeric_column(values)
+            weight, weight_ok = _numeric_column(weights)
+            numeric = value_ok & weight_ok
+
+            # Mismas reglas de elegibilidad que el cálculo escalar
+            annual_limit = rates.annual_limit(importations_count)
+            b_rows = np.flatnonzero(
+                numeric
+                & (category_arr == SenaeCategory.B.value)
+                & ~((weight > rates.b_max_weight) | (value > rates.b_max_value))
+                & (annual_limit is not None)
+            )
+            c_rows = np.flatnonzero(
+                numeric
+                & (category_arr == SenaeCategory.C.value)
+                & ~((weight > rates.c_max_weight) | (value > rates.c_max_value))
+            )
+            d_rows = np.flatnonzero(
+                numeric
+                & (category_arr == SenaeCategory.D.value)
+                & ~((weight > rates.d_max_weight) | (value > rates.d_max_value))
+            )
+            d_types = [product_types[i] for i in d_rows.tolist()]
+            d_is_str = np.fromiter((isinstance(t, str) for t in d_types), dtype=bool, count=len(d_types))
+            d_rows, d_types = d_rows[d_is_str], [t for t, ok in zip(d_types, d_is_str.tolist()) if ok]
+
+            # Categoría B: arancel fijo
+            if len(b_rows):
+                b_tariff = rates.b_fixed_tariff
+                b_value = value[b_rows]
+                row_tariff[b_rows] = b_tariff
+                b_idx = b_rows.tolist()
+                for i, total_cost in zip(b_idx, (b_value + b_tariff).tolist()):
+                    calculations[i] = {
+                        "category": "B",
+                        "base_value": values[i],
+                        "weight": weights[i],
+                        "tariff": b_tariff,
+                        "iva": 0,
+                        "fodinfa": 0,
+                        "adv": 0,
+                        "total_taxes": b_tariff,
+                        "total_cost": total_cost,
+                        "importations_count": importations_count,
+                        "annual_limit": annual_limit,
+                        "free_of_tributes": True,
+                        "rate_table_version": rates.version
+                    }
+
+            # Categoría C: arancel según partida, IVA y FODINFA
+            if len(c_rows):
+                iva_rate, fodinfa_rate = rates.iva_rate, rates.fodinfa_rate
+                tariff_rate = np.array([rates.tariff_rate(hs_codes[i]) for i in c_rows.tolist()], dtype=np.float64)
+                c_value = value[c_rows]
+                tariff = c_value * tariff_rate
+                iva = (c_value + tariff) * iva_rate
+                fodinfa = c_value * fodinfa_rate
+                total_taxes = tariff + iva + fodinfa
+                total_cost = c_value + total_taxes
+                row_tariff[c_rows] = tariff
+                row_iva[c_rows] = iva
+                row_fodinfa[c_rows] = fodinfa
+                for i, t, tr, iv, f, tt, tc in zip(
+                        c_rows.tolist(), tariff.tolist(), tariff_rate.tolist(), iva.tolist(), fodinfa.tolist(),
+                        total_taxes.tolist(), total_cost.tolist()
+                ):
+                    calculations[i] = {
+                        "category": "C",
+                        "base_value": values[i],
+                        "weight": weights[i],
+                        "tariff": t,
+                        "tariff_rate": tr,
+                        "iva": iv,
+                        "iva_rate": iva_rate,
+                        "fodinfa": f,
+                        "fodinfa_rate": fodinfa_rate,
+                        "adv": 0,
+                        "total_taxes": tt,
+                        "total_cost": tc,
+                        "requires_control_document": True,
+                        "rate_table_version": rates.version
+                    }
+
+            # Categoría D: ADV + tarifa específica por kg (textiles) o por par (calzado)
+            if len(d_rows):
+                iva_rate, fodinfa_rate = rates.iva_rate, rates.fodinfa_rate
+                d_idx = d_rows.tolist()
+                adv_rate = np.array([rates.adv_rate(hs_codes[i]) for i in d_idx], dtype=np.float64)
+                specific_rates = [rates.specific_rate(t) for t in d_types]
+                per_pair = np.array([r.per_pair or 0.0 for r in specific_rates], dtype=np.float64)
+                per_kg = np.array([r.per_kg for r in specific_rates], dtype=np.float64)
+                is_pair = np.fromiter((r.per_pair is not None for r in specific_rates), dtype=bool, count=len(d_idx))
+                d_value = value[d_rows]
+                d_weight = weight[d_rows]
+                adv = d_value * adv_rate
+                specific_tariff = np.where(is_pair, per_pair * np.maximum(1, np.trunc(d_weight)), per_kg * d_weight)
+                total_tariff = adv + specific_tariff
+                iva = (d_value + total_tariff) * iva_rate
+                fodinfa = d_value * fodinfa_rate
+                total_taxes = total_tariff + iva + fodinfa
+                total_cost = d_value + total_taxes
+                row_tariff[d_rows] = total_tariff
+                row_iva[d_rows] = iva
+                row_fodinfa[d_rows] = fodinfa
+                row_adv[d_rows] = adv
+                for i, pt, a, ar, st, tt_, iv, f, tt, tc, inen in zip(
+                        d_idx, d_types, adv.tolist(), adv_rate.tolist(), specific_tariff.tolist(),
+                        total_tariff.tolist(), iva.tolist(), fodinfa.tolist(), total_taxes.tolist(),
+                        total_cost.tolist(), (d_value > rates.d_inen_exemption_limit).tolist()
+                ):
+                    calculations[i] = {
+                        "category": "D",
+                        "base_value": values[i],
+                        "weight": weights[i],
+                        "product_type": pt,
+                        "adv": a,
+                        "adv_rate": ar,
+                        "specific_tariff": st,
+                        "total_tariff": tt_,
+                        "iva": iv,
+                        "iva_rate": iva_rate,
+                        "fodinfa": f,
+                        "fodinfa_rate": fodinfa_rate,
+                        "total_taxes": tt,
+                        "total_cost": tc,
+                        "requires_inen": inen,
+                        "inen_exemption_limit": rates.d_inen_exemption_limit,
+                        "rate_table_version": rates.version
+                    }
+
+            # Filas inválidas: mismo resultado (y mensaje de error) que el cálculo escalar
+            for i, calculation in enumerate(calculations):
+                if calculation is None:
+                    calculations[i] = SenaeCalculator.calculate_tariff(
+                        categories[i], values[i], weights[i],
+                        importations_count=importations_count,
+                        product_type=product_types[i],
+                        hs_code=hs_codes[i],
+                        rates=rates
+                    )
+
+        # Sumas acumuladas secuenciales (mismo orden de suma que el bucle escalar)
+        def _sequential_sum(column: np.ndarray) -> float:
+            return float(np.cumsum(column)[-1]) if n else 0
+
+        total_tariffs = {
+            "total_tariff": _sequential_sum(row_tariff),
+            "total_iva": _sequential_sum(row_iva),
+            "total_fodinfa": _sequential_sum(row_fodinfa),
+            "total_adv": _sequential_sum(row_adv)
+        }
+        total_tariffs["total_taxes"] = (
+                total_tariffs["total_tariff"] +
+                total_tariffs["total_iva"] +
+                total_tariffs["total_fodinfa"] +
+                total_tariffs["total_adv"]
+        )
+
+        return {
+            "calculations": calculations,
+            "total_tariffs": total_tariffs
+        }
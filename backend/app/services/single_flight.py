@@ -0,0 +1,40 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalescencia de peticiones concurrentes (single-flight).
+
+    Mientras una operación para una clave está en curso, las llamadas con la misma
+    clave esperan el mismo resultado en lugar de repetirla. La operación corre en
+    su propia tarea: si el llamador que la inició se cancela, los demás no se ven
+    afectados.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, operation: Callable[[], Awaitable[Any]]) -> Any:
+        """Ejecutar `operation` para la clave, o esperar la ejecución que ya está en curso"""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(operation())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._in_flight),
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced
+        }
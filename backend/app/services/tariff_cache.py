@@ -0,0 +1,97 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from app.models.order import SenaeCategory
+from app.services.senae_calculator import SenaeCalculator
+from app.services.rate_tables import get_rate_table, rate_tables
+
+load_dotenv()
+
+TARIFF_CACHE_SIZE = int(os.getenv("TARIFF_CACHE_SIZE", "10000"))
+TARIFF_CACHE_TTL_SECONDS = float(os.getenv("TARIFF_CACHE_TTL_SECONDS", "3600"))
+
+
+class TariffCache:
+    """
+    Memoización LRU con TTL de SenaeCalculator.calculate_tariff.
+
+    La clave es (versión de tarifas, categoría, valor, peso, tipo de producto,
+    importaciones, partida arancelaria). Cada
+    llamada devuelve una copia del resultado, así los llamadores pueden modificarlo
+    sin alterar la caché. invalidate() la vacía cuando cambian las tablas de tarifas.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # clave -> (vencimiento, resultado), del menos al más reciente
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def calculate_tariff(self, category: SenaeCategory, value: float, weight: float, **kwargs) -> Dict[str, Any]:
+        """Igual que SenaeCalculator.calculate_tariff, pero con memoización"""
+        rates = kwargs.pop("rates", None) or get_rate_table()
+        key = (
+            rates.version,
+            getattr(category, "value", category),
+            value,
+            weight,
+            kwargs.get("product_type", "textiles"),
+            kwargs.get("importations_count", 1),
+            kwargs.get("hs_code")
+        )
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+        self.misses += 1
+        result = SenaeCalculator.calculate_tariff(category, value, weight, rates=rates, **kwargs)
+        self._entries[key] = (now + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        # Los resultados son diccionarios planos: una copia superficial basta
+        return dict(result)
+
+    def invalidate(self, category: Optional[SenaeCategory] = None) -> int:
+        """Vaciar la caché (o solo una categoría); devuelve las entradas eliminadas"""
+        if category is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        category = getattr(category, "value", category)
+        keys = [key for key in self._entries if key[1] == category]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Contadores de aciertos y fallos de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+tariff_cache = TariffCache(max_size=TARIFF_CACHE_SIZE, ttl_seconds=TARIFF_CACHE_TTL_SECONDS)
+
+# Al cambiar la tabla de tarifas los resultados memoizados dejan de ser válidos
+rate_tables.add_listener(lambda table: tariff_cache.invalidate())
@@ -0,0 +1,164 @@
+import asyncio
+import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import UpdateOne
+from app.database import products_collection
+from app.services.product_cache import product_cache
+from app.services.rate_tables import RateTable, get_rate_table, rate_tables
+from app.services.senae_calculator import SenaeCalculator
+from app.instrumentation import record_error
+
+# Campos necesarios para recalcular la tarifa de un producto guardado
+TARIFF_SOURCE_FIELDS = ("price", "weight", "category")
+TARIFF_INPUT_PROJECTION = {"_id": 1, "asin": 1, **{field: 1 for field in TARIFF_SOURCE_FIELDS}}
+
+
+def tariff_inputs(price: float, weight: Optional[float], category: Optional[str]) -> Dict[str, Any]:
+    """Entradas normalizadas con las que se calcula la tarifa de un producto"""
+    return {
+        "price": price,
+        "weight": weight or 1.0,
+        "product_type": category or "general"
+    }
+
+
+def compute_product_tariffs(products: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """
+    Calcular en lote la categoría SENAE y la tarifa de varios productos
+    (documentos con price, weight y category). Devuelve (categoría, tarifa, entradas).
+    """
+    inputs = [tariff_inputs(p["price"], p.get("weight"), p.get("category")) for p in products]
+    categories = [
+        SenaeCalculator.determine_category(i["price"], i["weight"], p.get("category") or "")
+        for i, p in zip(inputs, products)
+    ]
+    batch = SenaeCalculator.calculate_tariff_batch(
+        categories,
+        [i["price"] for i in inputs],
+        [i["weight"] for i in inputs],
+        product_types=[i["product_type"] for i in inputs]
+    )
+    results = []
+    for category, calculation, product_inputs in zip(categories, batch["calculations"], inputs):
+        product_inputs["senae_category"] = category.value
+        product_inputs["rate_table_version"] = calculation.get("rate_table_version")
+        results.append((category.value, calculation, product_inputs))
+    return results
+
+
+class TariffMaterializer:
+    """
+    Mantiene materializada la tarifa de cada producto guardado.
+
+    Cada documento guarda en "tariff_inputs" el precio, peso, tipo de producto y
+    versión de tarifas con los que se calculó "calculated_tariff". Cuando cambia
+    la tabla de tarifas se marcan como "tariff_stale" solo los productos calculados
+    con otra versión y se recalculan en lotes, así las lecturas siempre pueden
+    servir el valor guardado sin calcular nada. Un cambio de precio, peso o
+    categoría no necesita marcarse: guardar el producto recalcula su tarifa.
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Un recálculo a la vez: el siguiente marca como desactualizado lo que el anterior
+        # haya guardado con una versión de tarifas que ya cambió
+        self._refresh_lock = asyncio.Lock()
+        self.last_refresh: Dict[str, Any] = {}
+
+    async def mark_stale(self, version: Optional[str] = None) -> int:
+        """Marcar como desactualizados los productos calculados con otra versión de tarifas"""
+        version = version or get_rate_table().version
+        result = await products_collection.update_many(
+            {"tariff_inputs.rate_table_version": {"$ne": version}, "tariff_stale": {"$ne": True}},
+            {"$set": {"tariff_stale": True}}
+        )
+        return result.modified_count
+
+    async def refresh_stale(self) -> Dict[str, Any]:
+        """Recalcular en lotes los productos marcados como desactualizados"""
+        refreshed = 0
+        batches = 0
+        started_at = datetime.datetime.utcnow()
+        skipped_ids = []
+
+        while True:
+            cursor = products_collection.find(
+                {"tariff_stale": True, "_id": {"$nin": skipped_ids}}, TARIFF_INPUT_PROJECTION
+            ).limit(self.batch_size)
+            products = await cursor.to_list(length=self.batch_size)
+            if not products:
+                break
+
+            now = datetime.datetime.utcnow()
+            operations = []
+            for product, (senae_category, calculation, inputs) in zip(products, compute_product_tariffs(products)):
+                # Solo se actualiza si ninguna entrada de la tarifa cambió mientras se calculaba
+                operations.append(UpdateOne(
+                    {"_id": product["_id"], **{field: product.get(field) for field in TARIFF_SOURCE_FIELDS},
+                     "tariff_stale": True},
+                    {"$set": {
+                        "senae_category": senae_category,
+                        "calculated_tariff": calculation,
+                        "tariff_inputs": inputs,
+                        "tariff_stale": False,
+                        "tariff_updated_at": now
+                    }}
+                ))
+
+            result = await products_collection.bulk_write(operations, ordered=False)
+            await product_cache.invalidate(product["asin"] for product in products)
+            refreshed += result.modified_count
+            batches += 1
+            if result.modified_count < len(operations):
+                # Documentos modificados en paralelo: no volver a leerlos en este recorrido
+                skipped_ids.extend(product["_id"] for product in products)
+
+        self.last_refresh = {
+            "refreshed": refreshed,
+            "batches": batches,
+            "started_at": started_at,
+            "finished_at": datetime.datetime.utcnow(),
+            "rate_table_version": get_rate_table().version
+        }
+        return self.last_refresh
+
+    async def refresh(self, version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Marcar los productos afectados por la versión vigente y recalcularlos.
+        Si ya hay un recálculo en curso, espera a que termine.
+        """
+        async with self._refresh_lock:
+            marked = await self.mark_stale(version)
+            result = await self.refresh_stale()
+        return {"marked_stale": marked, **result}
+
+    def schedule_refresh(self, table: Optional[RateTable] = None) -> None:
+        """Programar un recálculo en segundo plano (si hay un event loop activo)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._refresh_task = loop.create_task(self._refresh_in_background(table.version if table else None))
+
+    async def _refresh_in_background(self, version: Optional[str]) -> None:
+        try:
+            await self.refresh(version)
+        except Exception as e:
+            record_error("tariff_materializer")
+            print(f"Error al recalcular tarifas materializadas: {e}")
+
+    async def status(self) -> Dict[str, Any]:
+        """Cantidad de productos pendientes de recálculo y último recálculo"""
+        return {
+            "rate_table_version": get_rate_table().version,
+            "stale_products": await products_collection.count_documents({"tariff_stale": True}),
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+            "last_refresh": self.last_refresh
+        }
+
+
+tariff_materializer = TariffMaterializer()
+
+# Al cambiar la tabla de tarifas se recalculan solo los productos afectados
+rate_tables.add_listener(tariff_materializer.schedule_refresh)
@@ -0,0 +1,126 @@
+import csv
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+# Longitud máxima de una línea del cuerpo (evita acumular en memoria un cuerpo sin saltos de línea)
+MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(1024 * 1024)))
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Respuesta NDJSON que puede leer el cuerpo de la petición mientras responde.
+
+    StreamingResponse escucha `receive()` en paralelo para detectar desconexiones,
+    lo que consumiría los mensajes del cuerpo que el generador todavía está leyendo.
+    Aquí solo se envía la respuesta; una desconexión se detecta al leer el cuerpo.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+        if self.background is not None:
+            await self.background()
+
+
+def ndjson_line(record: Any) -> str:
+    """Serializar un registro como una línea NDJSON"""
+    return json.dumps(record, default=str, ensure_ascii=False) + "\n"
+
+
+async def iter_lines(request: Request) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Leer el cuerpo de la petición línea por línea: genera (número de línea, línea).
+    Una línea de más de MAX_LINE_BYTES responde 400.
+    """
+    buffer = bytearray()
+    line_number = 0
+
+    async for chunk in request.stream():
+        # Lo pendiente no tiene saltos de línea: solo se busca en lo recién llegado
+        search_from = len(buffer)
+        buffer += chunk
+        start = 0
+        end = buffer.find(b"\n", search_from)
+        while end >= 0:
+            line_number += 1
+            _check_line_length(line_number, end - start)
+            yield line_number, bytes(buffer[start:end])
+            start = end + 1
+            end = buffer.find(b"\n", start)
+        del buffer[:start]
+        _check_line_length(line_number + 1, len(buffer))
+
+    if buffer:
+        yield line_number + 1, bytes(buffer)
+
+
+def _check_line_length(line_number: int, length: int) -> None:
+    if length > MAX_LINE_BYTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La línea {line_number} supera el máximo de {MAX_LINE_BYTES} bytes"
+        )
+
+
+async def iter_ndjson(request: Request) -> AsyncIterator[Tuple[int, Optional[Any], Optional[str]]]:
+    """
+    Leer el cuerpo de la petición como NDJSON de forma incremental.
+    Genera (número de línea, objeto, error) sin cargar el cuerpo completo en memoria.
+    """
+    async for line_number, raw_line in iter_lines(request):
+        parsed = _parse_ndjson_line(line_number, raw_line)
+        if parsed is not None:
+            yield parsed
+
+
+async def iter_csv(request: Request) -> AsyncIterator[Tuple[int, Optional[Dict[str, str]], Optional[str]]]:
+    """
+    Leer el cuerpo de la petición como CSV con encabezado de forma incremental.
+    Genera (número de línea, fila como dict, error); admite campos entre comillas con saltos de línea.
+    """
+    header: Optional[List[str]] = None
+    pending = ""
+    first_line = 0
+
+    async for line_number, raw_line in iter_lines(request):
+        text = raw_line.decode("utf-8-sig" if line_number == 1 else "utf-8", errors="replace")
+        if not pending:
+            first_line = line_number
+        pending += text + "\n"
+        if pending.count('"') % 2:
+            # Un campo entre comillas sin cerrar no puede acumular el resto del cuerpo
+            _check_line_length(first_line, len(pending))
+            continue
+
+        row_text, pending = pending, ""
+        if not row_text.strip():
+            continue
+        values = next(csv.reader([row_text.rstrip("\r\n")]))
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        if len(values) != len(header):
+            yield first_line, None, f"Se esperaban {len(header)} columnas y hay {len(values)}"
+            continue
+        yield first_line, dict(zip(header, values)), None
+
+    if pending.strip():
+        yield first_line, None, "Campo entre comillas sin cerrar"
+
+
+def _parse_ndjson_line(line_number: int, raw_line: bytes) -> Optional[Tuple[int, Optional[Any], Optional[str]]]:
+    raw_line = raw_line.strip()
+    if not raw_line:
+        return None
+    try:
+        return line_number, json.loads(raw_line), None
+    except ValueError as e:
+        return line_number, None, f"JSON inválido: {e}"
@@ -0,0 +1,14 @@
+"""
+Benchmarks de iBizTrack (desde backend/):
+
+    python -m benchmarks.micro                  # calculadora SENAE, búsqueda de catálogo, serialización de órdenes
+    python -m benchmarks.load --mongomock       # carga end-to-end en proceso (o --url contra un servidor)
+    python -m benchmarks.serialization          # listas de órdenes/productos: response_model vs. orjson
+    python -m benchmarks.order_writes           # escrituras de órdenes contra un mongod local
+
+micro, load y serialization aceptan --save-baseline para guardar los resultados en benchmarks/baselines/
+y --check para compararlos con la línea base y terminar con código 1 si hay regresiones. Se compara
+el mejor p50 y throughput de --rounds rondas (p99 solo en operaciones de 1 ms o más). Las líneas
+base son tiempos absolutos de una máquina: no se versionan, se graban en la máquina que ejecuta
+--check, y --check se niega a comparar con una línea base grabada en otra máquina.
+"""
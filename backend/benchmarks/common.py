@@ -0,0 +1,195 @@
+"""Utilidades comunes de los benchmarks: estadísticas, tablas y líneas base"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+# Regresión tolerada frente a la línea base (0.30 = 30% más lento)
+DEFAULT_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.30"))
+
+# Rondas por benchmark: se compara el mejor valor de cada estadística entre rondas
+DEFAULT_ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+
+# p99 solo se compara (con el doble de tolerancia) en operaciones cuya mediana en la
+# línea base llega a este valor: en operaciones de microsegundos es puro ruido
+P99_GATE_MIN_MS = float(os.getenv("BENCH_P99_GATE_MIN_MS", "1.0"))
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples_seconds: List[float], wall_seconds: float, errors: int = 0) -> Dict[str, Any]:
+    """Throughput y percentiles (en ms) de una serie de latencias en segundos"""
+    return {
+        "count": len(samples_seconds),
+        "errors": errors,
+        "throughput": round(len(samples_seconds) / wall_seconds, 2) if wall_seconds else 0.0,
+        "p50_ms": round(percentile(samples_seconds, 50) * 1000, 4),
+        "p95_ms": round(percentile(samples_seconds, 95) * 1000, 4),
+        "p99_ms": round(percentile(samples_seconds, 99) * 1000, 4),
+    }
+
+
+def best_of(rounds: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Mejor valor de cada estadística entre varias rondas (como timeit): el ruido de
+    otros procesos solo puede sumar tiempo. Los errores se suman.
+    """
+    best = dict(rounds[0])
+    for result in rounds[1:]:
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            best[metric] = min(best[metric], result[metric])
+        best["throughput"] = max(best["throughput"], result["throughput"])
+        best["errors"] += result["errors"]
+    return best
+
+
+def _time_round(operation: Callable[[int], Any], iterations: int) -> Dict[str, Any]:
+    perf_counter = time.perf_counter
+    samples = []
+    started = perf_counter()
+    for i in range(iterations):
+        call_started = perf_counter()
+        operation(i)
+        samples.append(perf_counter() - call_started)
+    return summarize(samples, perf_counter() - started)
+
+
+class Suite:
+    """
+    Benchmarks síncronos medidos por rondas intercaladas, con el recolector de basura
+    desactivado. Cada ronda mide todos los casos una vez: los periodos lentos de la
+    máquina (otros procesos, CPU compartida) caen en una ronda de varios casos y no en
+    todas las rondas de uno solo, y best_of descarta esa ronda.
+    """
+
+    def __init__(self):
+        self._cases: Dict[str, Tuple[Callable[[int], Any], int, int, Optional[Callable[[], Any]]]] = {}
+
+    def add(self, name: str, operation: Callable[[int], Any], iterations: int, warmup: int = 100,
+            setup: Optional[Callable[[], Any]] = None) -> None:
+        """Registrar un caso; `setup` se ejecuta antes de cada ronda del caso (fuera de la medición)"""
+        self._cases[name] = (operation, iterations, warmup, setup)
+
+    def run(self, rounds: int = DEFAULT_ROUNDS) -> Dict[str, Dict[str, Any]]:
+        for operation, iterations, warmup, setup in self._cases.values():
+            if setup:
+                setup()
+            for i in range(min(warmup, iterations)):
+                operation(i)
+
+        results: Dict[str, List[Dict[str, Any]]] = {name: [] for name in self._cases}
+        gc.collect()
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(rounds):
+                for name, (operation, iterations, _, setup) in self._cases.items():
+                    if setup:
+                        setup()
+                    results[name].append(_time_round(operation, iterations))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return {name: best_of(rounds_results) for name, rounds_results in results.items()}
+
+
+def print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    width = max((len(name) for name in results), default=10)
+    print(f"{'benchmark':<{width}}  {'ops/s':>12}  {'p50 ms':>10}  {'p95 ms':>10}  {'p99 ms':>10}  {'errors':>6}")
+    for name, result in results.items():
+        print(f"{name:<{width}}  {result['throughput']:>12.1f}  {result['p50_ms']:>10.4f}  "
+              f"{result['p95_ms']:>10.4f}  {result['p99_ms']:>10.4f}  {result.get('errors', 0):>6}")
+
+
+def add_baseline_arguments(parser: argparse.ArgumentParser, default_baseline: str) -> None:
+    parser.add_argument("--baseline", default=os.path.join(BASELINES_DIR, default_baseline),
+                        help="Archivo JSON de la línea base")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como línea base")
+    parser.add_argument("--check", action="store_true",
+                        help="Comparar con la línea base y terminar con código 1 si hay regresiones")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Regresión tolerada (0.30 = 30%%)")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS,
+                        help="Rondas por benchmark (se compara la mejor)")
+    parser.add_argument("--output", help="Guardar los resultados en este archivo JSON")
+
+
+def machine_info() -> Dict[str, Any]:
+    """Máquina en la que se midió: una línea base solo vale para la misma máquina"""
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(), "cpu_count": os.cpu_count()}
+
+
+def save_results(path: str, results: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {"machine": machine_info(), "results": results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_with_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                          tolerance: float) -> List[str]:
+    """
+    Regresiones frente a la línea base en las estadísticas estables: p50 más alto,
+    throughput más bajo o más errores. p99 solo en operaciones de P99_GATE_MIN_MS o más.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        limits = {"p50_ms": tolerance}
+        if reference["p50_ms"] >= P99_GATE_MIN_MS:
+            limits["p99_ms"] = tolerance * 2
+        for metric, limit in limits.items():
+            if reference[metric] and result[metric] > reference[metric] * (1 + limit):
+                regressions.append(
+                    f"{name}: {metric} {result[metric]:.4f} > {reference[metric]:.4f} (+{limit:.0%})"
+                )
+        if reference["throughput"] and result["throughput"] < reference["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput']:.1f} < {reference['throughput']:.1f} (-{tolerance:.0%})"
+            )
+        if result.get("errors", 0) > reference.get("errors", 0):
+            regressions.append(f"{name}: {result['errors']} errores (línea base: {reference.get('errors', 0)})")
+    return regressions
+
+
+def finish(args: argparse.Namespace, results: Dict[str, Dict[str, Any]]) -> None:
+    """Imprimir, guardar y (con --check) comparar con la línea base"""
+    print_results(results)
+    if args.output:
+        save_results(args.output, results)
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f"\nLínea base guardada en {args.baseline}")
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo existe la línea base {args.baseline}; ejecutar con --save-baseline", file=sys.stderr)
+            sys.exit(2)
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        # Los tiempos absolutos solo se comparan en la máquina en la que se grabaron
+        if baseline.get("machine") != machine_info():
+            print(f"\nLa línea base {args.baseline} se grabó en otra máquina ({baseline.get('machine')});\n"
+                  f"volver a grabarla en esta con --save-baseline antes de usar --check", file=sys.stderr)
+            sys.exit(2)
+        regressions = compare_with_baseline(results, baseline["results"], args.tolerance)
+        if regressions:
+            print("\nREGRESIONES DE RENDIMIENTO:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  - {regression}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nSin regresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%})")
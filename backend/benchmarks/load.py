@@ -0,0 +1,144 @@
+"""
+Generador de carga end-to-end:
+
+- search: GET /api/products/search?q=...
+- create: POST /api/orders/
+- list:   GET /api/orders/?limit=20
+
+Cada escenario envía --requests peticiones con --concurrency clientes concurrentes,
+--rounds veces, y reporta el mejor throughput y p50/p95/p99 entre las rondas. Uso (desde backend/):
+
+    python -m benchmarks.load --url http://localhost:8000     # contra un servidor levantado
+    python -m benchmarks.load                                 # app en proceso con el MONGODB_URL del entorno
+    python -m benchmarks.load --mongomock                     # app en proceso con mongomock (sin mongod)
+
+Con --save-baseline / --check se guarda o compara con benchmarks/baselines/load.json
+(la línea base es local a cada máquina).
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import add_baseline_arguments, best_of, finish, summarize
+
+SEED = 20240501
+SEARCH_TERMS = ["echo", "headphones", "laptop", "zapatos", "camiseta", "kindle", "reloj", "cocina", "shoes", "watch"]
+
+
+def order_payload(rng: random.Random, i: int) -> Dict[str, Any]:
+    return {
+        "customer_name": f"Cliente {i}",
+        "customer_email": f"cliente{i}@email.com",
+        "customer_cedula": "1234567890",
+        "items": [
+            {
+                "product_asin": f"B0000000{j}",
+                "product_title": f"Producto {j}",
+                "quantity": rng.randint(1, 3),
+                "unit_price": round(rng.uniform(10, 300), 2),
+                "weight": round(rng.uniform(0.1, 3), 2),
+                "senae_category": rng.choice(["B", "C", "D"]),
+            }
+            for j in range(rng.randint(1, 4))
+        ],
+        "shipping_address": "Av. Amazonas 123, Quito, Ecuador",
+        "notes": "",
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, make_request: Callable[[int], Any],
+                       requests: int, concurrency: int) -> Dict[str, Any]:
+    samples: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await make_request(i)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - started, errors)
+
+
+async def run(client: httpx.AsyncClient, requests: int, concurrency: int, rounds: int) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(SEED)
+    scenarios = {
+        "search": lambda i: client.get("/api/products/search",
+                                       params={"q": SEARCH_TERMS[i % len(SEARCH_TERMS)], "limit": 10}),
+        "create": lambda i: client.post("/api/orders/", json=order_payload(rng, i)),
+        "list": lambda i: client.get("/api/orders/", params={"limit": 20}),
+    }
+
+    # Calentamiento: catálogo, conexiones y primeras órdenes para el listado
+    for make_request in scenarios.values():
+        await run_scenario(client, make_request, min(20, requests), 1)
+
+    results = {}
+    for name, make_request in scenarios.items():
+        results[f"http.{name}"] = best_of(
+            [await run_scenario(client, make_request, requests, concurrency) for _ in range(rounds)]
+        )
+    return results
+
+
+async def run_in_process(requests: int, concurrency: int, rounds: int, use_mongomock: bool) -> Dict[str, Dict[str, Any]]:
+    os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+    if use_mongomock:
+        import motor.motor_asyncio
+        import mongomock_motor
+
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run(client, requests, concurrency, rounds)
+    finally:
+        await app.router.shutdown()
+
+
+async def run_remote(url: str, requests: int, concurrency: int, rounds: int) -> Dict[str, Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        return await run(client, requests, concurrency, rounds)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL de un servidor levantado (por defecto la app en proceso)")
+    parser.add_argument("--mongomock", action="store_true", help="App en proceso con mongomock en lugar de mongod")
+    parser.add_argument("--requests", type=int, default=1000, help="Peticiones por escenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes concurrentes")
+    add_baseline_arguments(parser, "load.json")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        results = asyncio.run(run_remote(args.url, args.requests, args.concurrency, args.rounds))
+    else:
+        results = asyncio.run(run_in_process(args.requests, args.concurrency, args.rounds, args.mongomock))
+
+    target = args.url or ("app en proceso + mongomock" if args.mongomock else "app en proceso")
+    print(f"Carga end-to-end: {target}, {args.requests} peticiones por escenario, "
+          f"concurrencia {args.concurrency}\n")
+    finish(args, results)
+
+
+if __name__ == "__main__":
+    main()
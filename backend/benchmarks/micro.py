@@ -0,0 +1,169 @@
+"""
+Micro-benchmarks (sin base de datos):
+
+- SenaeCalculator.calculate_tariff por categoría y determine_category
+- SenaeCalculator.calculate_tariff_batch (1000 items)
+- AmazonService.search_products con catálogos de tamaño creciente
+- order_helper + OrderResponse + JSON de una orden de 5 items
+
+Uso (desde backend/):
+
+    python -m benchmarks.micro [--quick] [--save-baseline | --check]
+
+Los datos se generan con una semilla fija para que cada ejecución mida lo mismo.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+# Importar la app no debe intentar resolver la URL de MongoDB del .env
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+
+from bson import ObjectId  # noqa: E402
+from app.models.order import OrderResponse, SenaeCategory  # noqa: E402
+from app.routes.orders import order_helper  # noqa: E402
+from app.services.amazon_service import AmazonService  # noqa: E402
+from app.services.catalog_provider import LocalCatalogProvider  # noqa: E402
+from app.services.product_catalog import ProductCatalog  # noqa: E402
+from app.services.senae_calculator import SenaeCalculator  # noqa: E402
+from benchmarks.common import Suite, add_baseline_arguments, finish  # noqa: E402
+
+SEED = 20240501
+CATALOG_SIZES = (1_000, 10_000, 100_000)
+WORDS = [f"{prefix}{i}" for prefix in ("audio", "cable", "zapato", "camisa", "reloj", "libro") for i in range(2000)]
+CATEGORIES = ["Electronics", "Footwear", "Clothing", "Kitchen", "Books", "Toys"]
+
+
+def tariff_inputs(rng: random.Random, count: int):
+    ranges = {
+        SenaeCategory.B: ((5, 400), (0.1, 4)),
+        SenaeCategory.C: ((10, 2000), (0.1, 50)),
+        SenaeCategory.D: ((5, 2000), (0.1, 20)),
+    }
+    return {
+        category: [(round(rng.uniform(*values), 2), round(rng.uniform(*weights), 2)) for _ in range(count)]
+        for category, (values, weights) in ranges.items()
+    }
+
+
+def synthetic_catalog(rng: random.Random, size: int) -> ProductCatalog:
+    return ProductCatalog(
+        {
+            "asin": f"B{i:09d}",
+            "title": " ".join(rng.choices(WORDS, k=6)),
+            "category": rng.choice(CATEGORIES),
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "price": round(rng.uniform(5, 500), 2),
+            "weight": round(rng.uniform(0.1, 5), 2),
+            "availability": True,
+        }
+        for i in range(size)
+    )
+
+
+def sample_order() -> Dict[str, Any]:
+    now = datetime.utcnow()
+    items = []
+    for i in range(5):
+        calculation = SenaeCalculator.calculate_tariff(SenaeCategory.C, 120.0 + i, 1.5)
+        items.append({
+            "product_asin": f"B0000000{i}",
+            "product_title": f"Producto {i}",
+            "quantity": 2,
+            "unit_price": 60.0 + i,
+            "weight": 0.75,
+            "senae_category": "C",
+            "hs_code": None,
+            "tariff_calculation": calculation,
+        })
+    return {
+        "_id": ObjectId(),
+        "order_number": "IBT-20240501-ABCDEF12",
+        "customer_name": "Juan Pérez",
+        "customer_email": "juan@email.com",
+        "customer_cedula": "1234567890",
+        "items": items,
+        "shipping_address": "Av. Amazonas 123, Quito, Ecuador",
+        "notes": "",
+        "status": "draft",
+        "total_value": 620.0,
+        "total_weight": 7.5,
+        "total_tariffs": SenaeCalculator.summarize_tariffs([item["tariff_calculation"] for item in items]),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def run(iterations: int, catalog_sizes, rounds: int) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(SEED)
+    suite = Suite()
+
+    inputs = tariff_inputs(rng, iterations)
+    for category, rows in inputs.items():
+        suite.add(
+            f"senae.calculate_tariff.{category.value}",
+            lambda i, category=category, rows=rows: SenaeCalculator.calculate_tariff(category, *rows[i]),
+            iterations
+        )
+
+    flat = [row for rows in inputs.values() for row in rows]
+    suite.add(
+        "senae.determine_category",
+        lambda i: SenaeCalculator.determine_category(*flat[i], "textiles" if i % 3 == 0 else ""),
+        iterations
+    )
+
+    batch_size = 1000
+    categories = [rng.choice(list(SenaeCategory)) for _ in range(batch_size)]
+    values = [row[0] for row in flat[:batch_size]]
+    weights = [row[1] for row in flat[:batch_size]]
+    suite.add(
+        "senae.calculate_tariff_batch.1000",
+        lambda i: SenaeCalculator.calculate_tariff_batch(categories, values, weights),
+        max(20, iterations // 200), warmup=5
+    )
+
+    loop = asyncio.new_event_loop()
+    queries = [" ".join(rng.choices(WORDS, k=rng.choice((1, 2)))) for _ in range(500)]
+    for size in catalog_sizes:
+        provider = LocalCatalogProvider(synthetic_catalog(random.Random(SEED + size), size))
+        suite.add(
+            f"amazon.search_products.{size}",
+            lambda i: loop.run_until_complete(AmazonService.search_products(queries[i % len(queries)], None, 10)),
+            max(50, min(iterations, 2_000_000 // size)), warmup=20,
+            setup=lambda provider=provider: AmazonService.set_provider(provider)
+        )
+
+    order = sample_order()
+    suite.add("orders.order_helper+OrderResponse", lambda i: OrderResponse(**order_helper(order)), iterations)
+    suite.add(
+        "orders.OrderResponse.json", lambda i: OrderResponse(**order_helper(order)).model_dump_json(), iterations
+    )
+
+    try:
+        return suite.run(rounds)
+    finally:
+        loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--quick", action="store_true", help="Menos iteraciones y catálogos hasta 10k")
+    add_baseline_arguments(parser, "micro.json")
+    args = parser.parse_args()
+
+    iterations = 2_000 if args.quick else args.iterations
+    sizes = CATALOG_SIZES[:2] if args.quick else CATALOG_SIZES
+    started = time.perf_counter()
+    results = run(iterations, sizes, args.rounds)
+    print(f"Micro-benchmarks ({time.perf_counter() - started:.1f} s)\n")
+    finish(args, results)
+
+
+if __name__ == "__main__":
+    main()
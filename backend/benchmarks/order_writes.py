@@ -0,0 +1,122 @@
+"""
+Latencia de escritura de órdenes: lectura después de escribir vs. respuesta en memoria.
+
+Compara, contra un mongod local, los patrones anterior y actual de create_order
+y update_order_status y muestra p50/p99 de cada uno:
+
+    before: insert_one + find_one          | update_one + find_one
+    after:  insert_one (documento en memoria) | find_one_and_update
+
+Uso (desde backend/):
+
+    MONGODB_URL=mongodb://localhost:27017 python -m benchmarks.order_writes --iterations 2000
+
+Usa la base `ibiztrack_bench`, que se elimina al terminar.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from benchmarks.common import percentile
+
+BENCH_DATABASE = "ibiztrack_bench"
+
+
+def order_doc(i: int) -> Dict:
+    now = datetime.utcnow()
+    return {
+        "order_number": f"IBT-BENCH-{i:08d}",
+        "customer_name": "Juan Pérez",
+        "customer_email": "juan@email.com",
+        "customer_cedula": "1234567890",
+        "items": [{
+            "product_asin": "B08N5WRWNW",
+            "product_title": "Echo Dot (4th Gen)",
+            "quantity": 2,
+            "unit_price": 49.99,
+            "weight": 0.34,
+            "senae_category": "B",
+            "tariff_calculation": {"category": "B", "total_taxes": 20, "total_cost": 119.98}
+        }],
+        "shipping_address": "Av. Amazonas 123, Quito, Ecuador",
+        "notes": "",
+        "status": "draft",
+        "total_value": 99.98,
+        "total_weight": 0.68,
+        "total_tariffs": {"total_tariff": 20, "total_iva": 0, "total_fodinfa": 0, "total_adv": 0, "total_taxes": 20},
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+async def measure(operation: Callable[[int], Awaitable], iterations: int) -> List[float]:
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await operation(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(name: str, samples: List[float]) -> None:
+    print(f"{name:<28} p50={percentile(samples, 50):7.3f} ms  p99={percentile(samples, 99):7.3f} ms  "
+          f"mean={statistics.mean(samples):7.3f} ms")
+
+
+async def run(mongodb_url: str, iterations: int) -> None:
+    client = AsyncIOMotorClient(mongodb_url)
+    collection = client[BENCH_DATABASE]["orders"]
+    await client.drop_database(BENCH_DATABASE)
+    await collection.create_index("order_number", unique=True)
+
+    ids = []
+
+    async def create_before(i: int):
+        result = await collection.insert_one(order_doc(i))
+        ids.append(result.inserted_id)
+        return await collection.find_one({"_id": result.inserted_id})
+
+    async def create_after(i: int):
+        doc = order_doc(iterations + i)
+        await collection.insert_one(doc)
+        ids.append(doc["_id"])
+        return doc
+
+    async def update_before(i: int):
+        order_id = ids[i % len(ids)]
+        await collection.update_one(
+            {"_id": order_id}, {"$set": {"status": "pending", "updated_at": datetime.utcnow()}}
+        )
+        return await collection.find_one({"_id": order_id})
+
+    async def update_after(i: int):
+        return await collection.find_one_and_update(
+            {"_id": ids[i % len(ids)]},
+            {"$set": {"status": "processing", "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    try:
+        # Calentar conexiones y caché de WiredTiger
+        await measure(lambda i: collection.find_one({}), 100)
+
+        report("create_order  before", await measure(create_before, iterations))
+        report("create_order  after", await measure(create_after, iterations))
+        report("update_status before", await measure(update_before, iterations))
+        report("update_status after", await measure(update_after, iterations))
+    finally:
+        await client.drop_database(BENCH_DATABASE)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--mongodb-url", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    args = parser.parse_args()
+    asyncio.run(run(args.mongodb_url, args.iterations))
@@ -0,0 +1,91 @@
+"""
+Serialización de listas de órdenes y productos: response_model vs. respuesta de confianza.
+
+    before: Model(**helper(doc)) por documento + validación de response_model + JSONResponse
+    after:  helper(doc) por documento + ORJSONResponse (sin validación)
+
+Reporta el tiempo por lista y la diferencia por elemento. Uso (desde backend/):
+
+    python -m benchmarks.serialization [--items 100] [--save-baseline | --check]
+"""
+import argparse
+import asyncio
+import os
+from typing import Any, Dict, List
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from app.models.order import OrderResponse  # noqa: E402
+from app.models.product import ProductResponse  # noqa: E402
+from app.routes.orders import order_helper  # noqa: E402
+from app.routes.products import product_helper  # noqa: E402
+from app.serialization import trusted_response  # noqa: E402
+from app.services.amazon_service import AmazonService  # noqa: E402
+from app.services.senae_calculator import SenaeCalculator  # noqa: E402
+from app.services.product_persistence import build_product_doc  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from benchmarks.common import Suite, add_baseline_arguments, finish  # noqa: E402
+from benchmarks.micro import sample_order  # noqa: E402
+
+
+def product_docs(count: int) -> List[Dict[str, Any]]:
+    products = AmazonService._generate_mock_products()
+    docs = []
+    for i in range(count):
+        product = Product(**products[i % len(products)])
+        category = SenaeCalculator.determine_category(product.price, product.weight or 1.0, product.category or "")
+        calculation = SenaeCalculator.calculate_tariff(category, product.price, product.weight or 1.0)
+        docs.append({"_id": ObjectId(), **build_product_doc(product, category.value, calculation)})
+    return docs
+
+
+def run(items: int, iterations: int, rounds: int) -> Dict[str, Dict[str, Any]]:
+    loop = asyncio.new_event_loop()
+    cases = {
+        "orders": ([sample_order() for _ in range(items)], order_helper, OrderResponse),
+        "products": (product_docs(items), product_helper, ProductResponse),
+    }
+
+    suite = Suite()
+    for name, (docs, helper, model) in cases.items():
+        field = create_response_field(name="Response", type_=List[model], mode="serialization")
+
+        def before(i, docs=docs, helper=helper, model=model, field=field):
+            content = [model(**helper(doc)) for doc in docs]
+            serialized = loop.run_until_complete(serialize_response(field=field, response_content=content))
+            return JSONResponse(serialized).body
+
+        def after(i, docs=docs, helper=helper):
+            return trusted_response([helper(doc) for doc in docs]).body
+
+        suite.add(f"{name}.list{items}.response_model", before, iterations, warmup=20)
+        suite.add(f"{name}.list{items}.trusted", after, iterations, warmup=20)
+    try:
+        return suite.run(rounds)
+    finally:
+        loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100, help="Elementos por lista")
+    parser.add_argument("--iterations", type=int, default=300)
+    add_baseline_arguments(parser, "serialization.json")
+    args = parser.parse_args()
+
+    results = run(args.items, args.iterations, args.rounds)
+    for name in ("orders", "products"):
+        before = results[f"{name}.list{args.items}.response_model"]["p50_ms"]
+        after = results[f"{name}.list{args.items}.trusted"]["p50_ms"]
+        print(f"{name}: {before:.3f} ms -> {after:.3f} ms por lista "
+              f"({(before - after) * 1000 / args.items:.1f} µs menos por elemento, {before / after:.1f}x)")
+    print()
+    finish(args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -35,7 +35,7 @@ import {
   FavoriteOutlined as FavoriteIcon
 } from '@mui/icons-material';
 import { useNavigate } from 'react-router-dom';
-import { productService, orderService, formatCurrency, getSenaeCategoryName } from '../services/api';
+import { productService, orderService, analyticsService, formatCurrency, getSenaeCategoryName } from '../services/api';
 
 const Dashboard = () => {
   const navigate = useNavigate();
@@ -55,24 +55,21 @@ const Dashboard = () => {
       setLoading(true);
       setError(null);
 
-      const [productsData, ordersData] = await Promise.all([
+      const [productsData, ordersData, summary] = await Promise.all([
         productService.getTrendingProducts(8),
-        orderService.getOrders(null, null, 10, 0)
+        orderService.getOrders(null, null, 10, 0, null, 'summary'),
+        analyticsService.getSummary()
       ]);
 
       setTrendingProducts(productsData);
       setRecentOrders(ordersData);
 
-      // Calcular estadísticas
-      const totalValue = ordersData.reduce((sum, order) => sum + (order.total_value || 0), 0);
-      const totalTariffs = ordersData.reduce((sum, order) => sum + (order.total_tariffs?.total_taxes || 0), 0);
-      const avgTariff = ordersData.length > 0 ? totalTariffs / ordersData.length : 0;
-
+      // Estadísticas calculadas en el servidor sobre todas las órdenes
       setStats({
         totalProducts: productsData.length,
-        totalOrders: ordersData.length,
-        totalValue: totalValue,
-        averageTariff: avgTariff
+        totalOrders: summary.orders_count,
+        totalValue: summary.total_value,
+        averageTariff: summary.average_taxes
       });
 
     } catch (err) {
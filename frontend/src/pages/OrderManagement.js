@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Container,
   Typography,
@@ -64,6 +64,9 @@ import {
 } from '../services/api';
 import CreateOrderDialog from '../components/CreateOrderDialog';
 
+// Espera tras la última tecla antes de buscar en el servidor
+const SEARCH_DEBOUNCE_MS = 300;
+
 const OrderManagement = () => {
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -77,6 +80,8 @@ const OrderManagement = () => {
     customerEmail: '',
     search: ''
   });
+  // Identificador de la última carga: las respuestas de cargas anteriores se descartan
+  const latestRequest = useRef(0);
 
   const orderStatuses = [
     { value: '', label: 'Todos los estados' },
@@ -89,41 +94,49 @@ const OrderManagement = () => {
   ];
 
   const loadOrders = async () => {
+    const requestId = ++latestRequest.current;
     try {
       setLoading(true);
       setError(null);
+      // La búsqueda por número, nombre o email se resuelve en el servidor; la
+      // lista usa la vista resumida (sin items) y el detalle se pide al abrirlo
+      const search = filters.search.trim();
       const ordersData = await orderService.getOrders(
         filters.status || null,
         filters.customerEmail || null,
         50,
-        0
+        0,
+        search.length >= 2 ? search : null,
+        'summary'
       );
 
-      // Filtrar por búsqueda local si existe
-      let filteredOrders = ordersData;
-      if (filters.search) {
-        filteredOrders = ordersData.filter(order =>
-          order.order_number.toLowerCase().includes(filters.search.toLowerCase()) ||
-          order.customer_name.toLowerCase().includes(filters.search.toLowerCase()) ||
-          order.customer_email.toLowerCase().includes(filters.search.toLowerCase())
-        );
+      if (requestId === latestRequest.current) {
+        setOrders(ordersData);
       }
-
-      setOrders(filteredOrders);
     } catch (err) {
-      setError(err.message);
+      if (requestId === latestRequest.current) {
+        setError(err.message);
+      }
     } finally {
-      setLoading(false);
+      if (requestId === latestRequest.current) {
+        setLoading(false);
+      }
     }
   };
 
   useEffect(() => {
-    loadOrders();
+    const timer = setTimeout(loadOrders, SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
   }, [filters]);
 
-  const handleViewOrder = (order) => {
-    setSelectedOrder(order);
-    setDetailsOpen(true);
+  const handleViewOrder = async (order) => {
+    try {
+      const fullOrder = await orderService.getOrderById(order.id);
+      setSelectedOrder(fullOrder);
+      setDetailsOpen(true);
+    } catch (err) {
+      setError(err.message);
+    }
   };
 
   const handleCloseDetails = () => {
@@ -215,7 +228,7 @@ const OrderManagement = () => {
 
           <Grid item xs={12} sm={2}>
             <Typography variant="body2">
-              {order.items?.length || 0} productos
+              {order.items_count || 0} productos
             </Typography>
             <Typography variant="caption" color="text.secondary">
               {order.total_weight?.toFixed(2)} kg
@@ -226,9 +239,9 @@ const OrderManagement = () => {
             <Typography variant="subtitle1" fontWeight="bold">
               {formatCurrency(order.total_value)}
             </Typography>
-            {order.total_tariffs?.total_taxes && (
+            {order.total_taxes > 0 && (
               <Typography variant="caption" color="warning.main">
-                +{formatCurrency(order.total_tariffs.total_taxes)} impuestos
+                +{formatCurrency(order.total_taxes)} impuestos
               </Typography>
             )}
           </Grid>
@@ -101,10 +101,12 @@ export const orderService = {
     return apiService.post('/orders/', orderData);
   },
 
-  getOrders: async (status = null, customerEmail = null, limit = 10, skip = 0) => {
+  getOrders: async (status = null, customerEmail = null, limit = 10, skip = 0, query = null, view = null) => {
     const params = { limit, skip };
     if (status) params.status = status;
     if (customerEmail) params.customer_email = customerEmail;
+    if (query) params.q = query;
+    if (view) params.view = view;
     return apiService.get('/orders/', params);
   },
 
@@ -129,6 +131,28 @@ export const orderService = {
   }
 };
 
+// Analytics Services
+export const analyticsService = {
+  getSummary: async (dateFrom = null, dateTo = null) => {
+    const params = {};
+    if (dateFrom) params.date_from = dateFrom;
+    if (dateTo) params.date_to = dateTo;
+    return apiService.get('/analytics/summary', params);
+  },
+
+  getTotalsByStatus: async () => {
+    return apiService.get('/analytics/by-status');
+  },
+
+  getTotalsByCategory: async () => {
+    return apiService.get('/analytics/by-category');
+  },
+
+  getDailyTotals: async (limit = 31) => {
+    return apiService.get('/analytics/daily', { limit });
+  }
+};
+
 // Utility Functions
 export const formatCurrency = (amount) => {
   return new Intl.NumberFormat('es-EC', {